@@ -10,10 +10,18 @@ last modified: 2024-02-19
 import wx
 import logging
 import time
+import multiprocessing
 from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
 import os
 from pubsub import pub
 import filehashingservice
+import jobscheduler
+import hashcache
+import hashalgorithms
+import jobjournal
+import sqlite3
+import threading
 import subprocess
 import pyperclip
 from datetime import timedelta
@@ -43,12 +51,144 @@ log_write = os.path.join(log_file_location, log_timestamp)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 formatter = logging.Formatter("%(asctime)s:%(module)s:%(levelname)s:%(message)s")
-file_handler = logging.FileHandler(log_write)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
 
-### Initiate threading to file processing off the main thread
-thread_pool_executor = futures.ThreadPoolExecutor(max_workers=1)
+### default user settings, changed from the Settings page
+default_settings = {
+    "single_pass_copy": True,  # generate checksums from the same read as the copy
+    "verify_after_copy": True,  # re-read and verify files at the destination after copy
+    "durability": "none",  # none leaves flushing copies and checksum files to the system, file fsyncs each file, batch syncs them in groups
+    "sync_batch_files": 64,  # files written between syncs in batch durability
+    "sync_batch_mb": 256,  # MB written between syncs in batch durability
+    "max_workers": 4,  # number of files processed at the same time
+    "rotational_streams": 1,  # concurrent files per spinning disk
+    "solid_state_streams": 4,  # concurrent files per SSD
+    "process_pool_hashing": True,  # generate checksums for small files in batches on all CPU cores
+    "chunk_size": 1024 * 1024,  # bytes read at a time when generating, copying and verifying
+    "copy_buffers": 4,  # chunks read ahead of the destination writes when copying, 1 reads and writes in turn
+    "quick_verify": False,  # use cached checksums for files unchanged since they were last read
+    "cache_mode": "normal",  # normal, drop files from the page cache as they're read, or direct reads that bypass it
+    "recursive": False,  # include files in subfolders of the source location
+    "checksum_algorithm": "md5",  # algorithm for new checksum files, existing checksum files are verified with their own algorithm
+    "manifest_mode": False,  # write one checksum list per folder instead of a checksum file per file
+    "additional_checksum_algorithms": [],  # algorithms also generated from the same read of each file, written to their own checksum files
+    "block_hashes": False,  # also write 64MB block checksums for large files, verified in parallel and corrupt blocks recopied after copy
+    "sample_blocks": 0,  # blocks read when verifying an unchanged file with block checksums, 0 verifies every file in full
+    "full_verify_days": 30,  # days between full verifies of a sampled file
+    "full_verify_budget": 0,  # GB of periodic full verifies in a run, 0 for no limit
+    "rate_limit": 0,  # MB/s read and written by every file operation together, 0 for no limit, can be changed while files are processed
+    "nice": 0,  # CPU niceness of the worker threads, 0 leaves it unchanged (Linux)
+    "io_priority": "normal",  # disk priority of the worker threads, normal, low or idle (Linux)
+}
+
+### settings applied while files are processed, the others are held until the operation completes so every file of a run uses the same settings
+live_settings = ("rate_limit", "nice", "io_priority")
+
+### checksum algorithms offered on the Settings page, BLAKE3 and xxHash are only listed if their packages are installed
+checksum_algorithm_labels = {
+    "md5": "MD5",
+    "sha1": "SHA-1",
+    "sha256": "SHA-256",
+    "blake2b": "BLAKE2b",
+    "blake3": "BLAKE3 (multi-core)",
+    "xxh3": "xxHash3 (fast, non-cryptographic)",
+    "xxh128": "xxHash128 (fast, non-cryptographic)",
+}
+checksum_algorithm_choices = {
+    checksum_algorithm_labels[checksum_algorithm]: checksum_algorithm
+    for checksum_algorithm in checksum_algorithm_labels
+    if checksum_algorithm in hashalgorithms.hash_algorithms
+}
+
+### the resource each timed phase waits on, shown on the Report page to identify the bottleneck
+timing_phase_resources = {
+    "read": "source disk",
+    "hash": "CPU",
+    "write": "destination disk",
+    "kernel_copy": "source and destination disks",
+    "fsync": "destination disk",
+    "checksum_file": "checksum file I/O",
+    "throttle": "bandwidth limit",
+}
+
+### read chunk sizes offered on the Settings page
+chunk_size_choices = {
+    "64 KB": 64 * 1024,
+    "256 KB": 256 * 1024,
+    "1 MB": 1024 * 1024,
+    "4 MB": 4 * 1024 * 1024,
+    "16 MB": 16 * 1024 * 1024,
+}
+
+### page cache use offered on the Settings page
+cache_mode_choices = {
+    "Normal (files stay in the system cache)": "normal",
+    "Drop files from the system cache as they're read": "drop",
+    "Direct I/O (read from the disk without the system cache)": "direct",
+}
+
+### when written files are flushed to disk offered on the Settings page
+durability_choices = {
+    "Left to the system (fastest, recent copies can be lost in a crash)": "none",
+    "Sync each file as it's written": "file",
+    "Sync files in batches": "batch",
+}
+
+### disk priorities of the worker threads offered on the Settings page
+io_priority_choices = {
+    "Normal": "normal",
+    "Low": "low",
+    "Idle (only when no other program is using the disk)": "idle",
+}
+
+### several destinations are entered in the destination field separated by semicolons, files are copied to each of them
+destination_separator = "; "
+
+
+### get the destination directories from the destination field text, in order without duplicates
+def parse_destination_locations(text):
+    destination_locations = []
+    for location in text.split(";"):
+        location = location.strip()
+        if location and location not in destination_locations:
+            destination_locations.append(location)
+    return destination_locations
+
+
+small_file_size = 1024 * 1024  # files up to 1MB are hashed in the process pool
+small_file_batch_size = 64  # number of small files sent to a worker process at once
+
+### Initiate threading to file processing off the main thread, files on the same device share a limited number of streams
+file_scheduler = jobscheduler.DeviceScheduler(
+    max_workers=default_settings["max_workers"],
+    rotational_streams=default_settings["rotational_streams"],
+    solid_state_streams=default_settings["solid_state_streams"],
+)
+
+### process pool to hash batches of small files outside of the GIL, started on first use and started again if a worker process dies
+process_pool_executor = None
+process_pool_lock = threading.Lock()
+
+
+def get_process_pool_executor():
+    global process_pool_executor
+    with process_pool_lock:
+        if process_pool_executor is None:
+            process_pool_executor = futures.ProcessPoolExecutor()  # one worker process per CPU core
+        return process_pool_executor
+
+
+### drop a process pool broken by a worker process dying, the batches sent to it fail and the next batch starts a new pool
+def restart_process_pool_executor(broken_executor):
+    global process_pool_executor
+    with process_pool_lock:
+        if process_pool_executor is broken_executor:
+            process_pool_executor = None
+    broken_executor.shutdown(wait=False)
+
+
+### send progress updates to the update_progress_bar method on the UI thread, wx.CallAfter queues the event and returns without waiting for the UI
+def send_progress_update(**progress):
+    wx.CallAfter(pub.sendMessage, "progress_update", **progress)
 
 
 ### UI tab panels
@@ -58,9 +198,11 @@ class TabPanel(wx.Notebook):
 
         aca_panel = AcaInterface(self)
         report_panel = ReportInterface(self)
+        settings_panel = SettingsInterface(self)
 
         self.AddPage(aca_panel, "aca")
         self.AddPage(report_panel, "Report")
+        self.AddPage(settings_panel, "Settings")
 
 
 ### Main UI frame to hold the tab panels
@@ -75,7 +217,7 @@ class MainUIFrame(wx.Frame):
         self.SetSizer(main_ui_sizer)
 
         ### status bar used to show the user messages
-        self.live_reporting_status_bar = self.CreateStatusBar(2)
+        self.live_reporting_status_bar = self.CreateStatusBar(3)
 
         self.Show()
 
@@ -86,6 +228,49 @@ class MainUIFrame(wx.Frame):
         self.live_reporting_status_bar.PushStatusText(message, column)
 
 
+### virtual file list, rows are drawn on demand from the filehashingservice.file_data_list so large directories don't create a row for every file
+class FileListCtrl(wx.ListCtrl):
+    def __init__(self, parent, is_dark_mode):
+        wx.ListCtrl.__init__(
+            self,
+            parent,
+            size=(-1, 660),
+            style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_HRULES | wx.LC_VRULES | wx.SUNKEN_BORDER,
+        )
+        self.file_data_list = []
+        self.empty_state = None
+
+        ### alternates each row colour for better visibility
+        self.alternate_row_attr = wx.ItemAttr()
+        if is_dark_mode:
+            self.alternate_row_attr.SetBackgroundColour(wx.Colour(40, 40, 40))
+        else:
+            self.alternate_row_attr.SetBackgroundColour(wx.Colour(240, 240, 240))
+
+    ### show a file data list, item_count can be less than the list length while a scan is still adding files
+    def set_file_data_list(self, file_data_list, empty_state, item_count=None):
+        self.file_data_list = file_data_list
+        self.empty_state = empty_state
+        self.SetItemCount(len(file_data_list) if item_count is None else item_count)
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        file_data = self.file_data_list[item]
+        if column == 0:
+            return " " + file_data["filename"]
+        elif column == 1:
+            if file_data["hash"] == self.empty_state and "cached_hash" in file_data:
+                return " " + file_data["cached_hash"] + " (cached)"  # files without a checksum file show the checksum from a previous run
+            return " " + file_data["hash"]
+        else:
+            return file_data.get("status", {}).get(column, "")  # status column symbols (o, -, x)
+
+    def OnGetItemAttr(self, item):
+        if item % 2:
+            return self.alternate_row_attr
+        return None
+
+
 ### main application UI
 class AcaInterface(wx.Panel):
     def __init__(self, parent):
@@ -94,12 +279,25 @@ class AcaInterface(wx.Panel):
             wx.SystemSettings.GetColour(wx.SYS_COLOUR_WINDOW).GetLuminance() < 1
         )  # detect system dark mode to adjust colour scheme
         self.selected_source_location = os.getcwd()
-        self.selected_destination_location = os.getcwd()
-        self.column_no = None
+        self.selected_destination_locations = [os.getcwd()]  # files are copied to every destination from one read of the source
+        self.settings = dict(default_settings)
+
+        ### checksums from previous runs, shared by every source location
+        try:
+            self.hash_cache = hashcache.HashCache()
+        except (OSError, sqlite3.Error):
+            self.hash_cache = None  # aca runs without the cache if it can't be opened
+
+        ### progress of copy jobs, so a copy interrupted by a crash or a disconnected drive continues where it stopped
+        try:
+            self.job_journal = jobjournal.JobJournal()
+        except (OSError, sqlite3.Error):
+            self.job_journal = None  # copies run without the journal and start again from the beginning if interrupted
 
         ### UI labels and icons
         self.set_source_button_label = "Select Source Files"
         self.set_destination_button_label = "Select Destination "
+        self.add_destination_button_label = "+"  # add another destination to copy to
         self.refresh_state_button_label = "\u21BB" # refresh button icon "↻"
         self.select_all_button_label = "Select All"
         self.clear_selected_button_label = "Clear Selected"
@@ -112,11 +310,20 @@ class AcaInterface(wx.Panel):
         self.pass_status = "  \u2B58" # pass symbol "○"
         self.ignore_status = "  \u002D" # ignore symbol "-"
         self.fail_status = "  \u0058" # fail symbol "X"
+        self.status_symbols = {
+            filehashingservice.PASS: self.pass_status,
+            filehashingservice.SKIP: self.ignore_status,
+            filehashingservice.FAIL: self.fail_status,
+        }
 
         self.selected_items = []  # List of selected items in the ui_file_list
-        self.progress_bar_division = 1
+        self.progress_phases = ["generate"]  # file processes shown in the progress_bar, in order
         self.start_time = None
         self.end_time = None
+        self.completed_items = 0  # number of files finished by the file_scheduler workers
+        self.source_scanning = False  # a recursive source scan is running
+        self.operation_running = False  # a generate, copy or verify operation is running
+        self.report_lock = threading.Lock()  # guards the Report page status lists and completed_items across workers
 
         ### initialise Report page status lists
         self.generate_complete = []
@@ -127,6 +334,8 @@ class AcaInterface(wx.Panel):
         self.verify_complete = []
         self.verify_skip = []
         self.verify_fail = []
+        self.file_results = []  # filehashingservice.FileResult of each file operation for the Report page timings
+        self.destination_results = {}  # destination: {process: {status: number of files}} for the Report page
 
         super().__init__(parent)
 
@@ -144,7 +353,11 @@ class AcaInterface(wx.Panel):
         self.destination_location = wx.TextCtrl(self, style=wx.TE_PROCESS_ENTER)
         self.destination_location.Bind(wx.EVT_TEXT_ENTER, self.enter_destination)
 
+        self.add_destination_button = wx.Button(self, label=self.add_destination_button_label, size=(30, -1))
+        self.add_destination_button.SetToolTip("Add another destination, files are read once and copied to every destination")
+
         self.set_destination_button.Bind(wx.EVT_BUTTON, self.set_destination_location)
+        self.add_destination_button.Bind(wx.EVT_BUTTON, self.add_destination_location)
 
         self.select_all_button = wx.Button(self, label=self.select_all_button_label)
         self.clear_selected_button = wx.Button(self, label=self.clear_selected_button_label)
@@ -156,11 +369,7 @@ class AcaInterface(wx.Panel):
         self.sort_button.Bind(wx.EVT_BUTTON, self.on_sort_click)
 
         ### aca interface central file list
-        self.ui_file_list = wx.ListCtrl(
-            self,
-            size=(-1, 660),
-            style=wx.LC_REPORT | wx.LC_HRULES | wx.LC_VRULES | wx.SUNKEN_BORDER,
-        )
+        self.ui_file_list = FileListCtrl(self, self.is_dark_mode)
 
         self.ui_file_list.InsertColumn(0, "FILE")
         self.ui_file_list.InsertColumn(1, "CHECKSUM")
@@ -172,12 +381,6 @@ class AcaInterface(wx.Panel):
         self.ui_file_list.SetColumnWidth(4, 40)
 
         self.ui_file_list.Bind(wx.EVT_SIZE, self.on_size)
-        self.ui_file_list.Bind(
-            wx.EVT_LIST_ITEM_SELECTED, self.ui_file_list_item_selected
-        )
-        self.ui_file_list.Bind(
-            wx.EVT_LIST_ITEM_DESELECTED, self.ui_file_list_item_deselected
-        )
 
         ### aca file opration buttons
         self.generate_button = wx.Button(self, label=self.generate_button_label)
@@ -224,6 +427,9 @@ class AcaInterface(wx.Panel):
         self.destination_layout.Add(
             self.destination_location, 1, wx.LEFT | wx.EXPAND, 6
         )
+        self.destination_layout.Add(
+            self.add_destination_button, 0, wx.LEFT | wx.EXPAND, 6
+        )
 
         self.source_destination_stack = wx.BoxSizer(wx.VERTICAL)
         self.source_destination_stack.Add(self.source_layout, 0, wx.ALL | wx.EXPAND, 6)
@@ -261,10 +467,67 @@ class AcaInterface(wx.Panel):
         self.SetSizerAndFit(self.aca_vertical_stack)
 
         pub.subscribe(self.update_progress_bar, "progress_update")
+        pub.subscribe(self.update_settings, "settings_update")
+
+        ### live throughput of every file operation together, shown in the live_reporting_status_bar
+        self.throughput_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.update_throughput, self.throughput_timer)
+        self.throughput_timer.Start(1000)
 
         ### set initial button access for aca
         self.initial_button_access()
 
+    ### subscribes to the Settings page to receive user setting changes
+    def update_settings(self, setting, value):
+        self.settings[setting] = value
+        if not hasattr(self, "fhs"):
+            return
+        if self.operation_running:
+            if setting in live_settings:
+                self.apply_live_settings()  # the other settings are applied when the operation completes
+        else:
+            self.apply_settings()
+
+    ### pass the current settings to the filehashingservice
+    def apply_settings(self):
+        self.fhs.chunk_size = self.settings["chunk_size"]
+        self.fhs.pipeline_depth = self.settings["copy_buffers"]
+        self.fhs.quick_verify = self.settings["quick_verify"]
+        self.fhs.cache_mode = self.settings["cache_mode"]
+        self.fhs.durability = self.settings["durability"]
+        self.fhs.single_pass_copy = self.settings["single_pass_copy"]
+        self.fhs.verify_after_copy = self.settings["verify_after_copy"]
+        self.fhs.sync_batch.batch_files = self.settings["sync_batch_files"]
+        self.fhs.sync_batch.batch_bytes = self.settings["sync_batch_mb"] * 1024 * 1024
+        self.fhs.recursive = self.settings["recursive"]
+        self.fhs.checksum_algorithm = self.settings["checksum_algorithm"]
+        self.fhs.manifest_mode = self.settings["manifest_mode"]
+        self.fhs.additional_checksum_algorithms = self.settings["additional_checksum_algorithms"]
+        self.fhs.block_hashes = self.settings["block_hashes"]
+        self.fhs.sample_blocks = self.settings["sample_blocks"]
+        self.fhs.full_verify_interval = self.settings["full_verify_days"] * 24 * 60 * 60
+        self.fhs.full_verify_budget = self.settings["full_verify_budget"] * 1000 * 1000 * 1000 or None
+        self.apply_live_settings()
+
+    ### pass the live_settings to the filehashingservice and file_scheduler, these can change while files are processed
+    def apply_live_settings(self):
+        self.fhs.rate_limiter.set_rate(self.settings["rate_limit"] * 1000 * 1000 or None)
+        file_scheduler.nice = self.settings["nice"]  # worker threads take the priority at the start of their next file
+        file_scheduler.io_priority = self.settings["io_priority"]
+
+    ### show the bytes read and written per second by every file operation together, and the bandwidth limit if one is set
+    def update_throughput(self, event):
+        if not hasattr(self, "fhs"):
+            return
+        throughput = self.fhs.rate_limiter.get_throughput()
+        if throughput == 0:
+            message = ""
+        elif self.settings["rate_limit"]:
+            message = f"{throughput / 1000000:.1f} of {self.settings['rate_limit']} MB/s"
+        else:
+            message = f"{throughput / 1000000:.1f} MB/s"
+        pub.sendMessage("status_message_update", message=message, column=2)
+
     ### adjust the ui_file_list to resize in proportion to the interface
     def on_size(self, event):
         width = (
@@ -282,8 +545,9 @@ class AcaInterface(wx.Panel):
 
     ### initial button access at start up
     def initial_button_access(self):
-        self.set_source_button.Enable(True)
-        self.refresh_state_button.Enable(True)
+        self.operation_running = False
+        self.set_source_button.Enable(not self.source_scanning)
+        self.refresh_state_button.Enable(not self.source_scanning)
 
         self.select_all_button.Enable(False)
         self.clear_selected_button.Enable(False)
@@ -292,13 +556,16 @@ class AcaInterface(wx.Panel):
         self.copy_button.Enable(False)
         self.verify_button.Enable(False)
 
-        if self.selected_destination_location != None:
+        if self.selected_destination_locations:
             self.set_destination_button.Enable(True)
+            self.add_destination_button.Enable(True)
 
     ### Disable buttons during operations
     def disable_buttons(self):
+        self.operation_running = True
         self.set_source_button.Enable(False)
         self.set_destination_button.Enable(False)
+        self.add_destination_button.Enable(False)
         self.refresh_state_button.Enable(False)
         self.select_all_button.Enable(False)
         self.clear_selected_button.Enable(False)
@@ -309,16 +576,21 @@ class AcaInterface(wx.Panel):
 
     ### enable buttons to start file processing operations
     def enable_buttons(self):
-        self.set_source_button.Enable(True)
+        if self.operation_running:
+            return  # buttons are enabled again when the file operation completes
+
+        ### the source can't be changed or sorted while it is being scanned
+        self.set_source_button.Enable(not self.source_scanning)
         self.set_destination_button.Enable(True)
-        self.refresh_state_button.Enable(True)
+        self.add_destination_button.Enable(True)
+        self.refresh_state_button.Enable(not self.source_scanning)
         self.select_all_button.Enable(True)
         self.clear_selected_button.Enable(True)
-        self.sort_button.Enable(True)
+        self.sort_button.Enable(not self.source_scanning)
         self.generate_button.Enable(True)
         self.verify_button.Enable(True)
 
-        if self.selected_destination_location != None and os.path.exists(self.selected_destination_location):
+        if self.destinations_available():
             self.copy_button.Enable(True)
 
     def enter_source(self, event):
@@ -329,20 +601,27 @@ class AcaInterface(wx.Panel):
 
     ### capture the directory from the source_location textctrl
     def capture_source_location(self):
+        if self.source_scanning:
+            return
+
         self.selected_source_location = self.source_location.GetValue()
         if os.path.exists(self.selected_source_location):
 
             ### call the filehashingservice and pass the source directory to it
-            self.fhs = filehashingservice.FileHashingService(self.selected_source_location)
+            self.fhs = filehashingservice.FileHashingService(
+                self.selected_source_location,
+                hash_cache=self.hash_cache,
+                progress_callback=send_progress_update,
+            )
+            self.apply_settings()
 
             ### publisher to send source location to Report page
             pub.sendMessage(
                 "source_report_update",
                 data=self.selected_source_location,
             )
-            ### Get the file list from the get_file_list method and populate the list view
-            self.fhs.get_file_list()
-            self.populate_ui_file_list_view()
+            ### Get the file list and populate the list view
+            self.scan_source_location()
         else:
             self.ui_file_list.DeleteAllItems()
             self.selected_items.clear()
@@ -353,13 +632,14 @@ class AcaInterface(wx.Panel):
                 column=0,
             )
     
+    ### capture the directories from the destination_location textctrl, several destinations are separated by semicolons
     def capture_destination_location(self):
-        self.selected_destination_location = self.destination_location.GetValue()
-        if os.path.exists(self.selected_destination_location):
+        self.selected_destination_locations = parse_destination_locations(self.destination_location.GetValue())
+        if self.destinations_available():
             self.enable_buttons()
             
             pub.sendMessage(
-                "destination_report_update", data=self.selected_destination_location
+                "destination_report_update", data=destination_separator.join(self.selected_destination_locations)
             )
 
         else:
@@ -368,6 +648,12 @@ class AcaInterface(wx.Panel):
                 message="Destination directory does not exist",
                 column=0,
             )
+
+    ### check there is at least one destination and every destination exists
+    def destinations_available(self):
+        return len(self.selected_destination_locations) > 0 and all(
+            os.path.exists(location) for location in self.selected_destination_locations
+        )
         
     ### open the source location dialog for the user to select and set
     def set_source_directory(self, event):
@@ -395,32 +681,80 @@ class AcaInterface(wx.Panel):
                 )
                 pass
 
-    ### writes the filename and hash labels to the ui_file_list
-    def set_item_labels(self, index, data):
-        self.ui_file_list.SetItem(index, column=0, label=str(" " + data["filename"]))
-        self.ui_file_list.SetItem(index, column=1, label=str(" " + data["hash"]))
+    ### scan the source location into the ui_file_list, an incremental scan only reads files changed since the last scan
+    def scan_source_location(self, incremental=False):
+        if not incremental:
+            self.fhs.file_listing.clear()
+        for file_data in self.fhs.file_data_list:
+            file_data.pop("status", None)  # clear status symbols from file data kept by an incremental scan
+        self.ui_file_list.DeleteAllItems()
+        self.selected_items.clear()
 
-    ### alternates each row colour on the ui_file_list for better visibility
-    def ui_list_row_colour(self, file_index):
-        if file_index % 2 and self.is_dark_mode:
-            self.ui_file_list.SetItemBackgroundColour(
-                file_index, (wx.Colour(40, 40, 40))
-            )
-        elif file_index % 2:
-            self.ui_file_list.SetItemBackgroundColour(
-                file_index, (wx.Colour(240, 240, 240))
-            )
+        if self.fhs.recursive:
+            ### the directory tree is walked off the main thread, files are listed as each directory is scanned so they can be processed before the scan finishes
+            self.source_scanning = True
+            self.set_source_button.Enable(False)
+            self.refresh_state_button.Enable(False)
+            self.sort_button.Enable(False)
+            threading.Thread(
+                target=self.scan_source_tree, args=(incremental,), daemon=True
+            ).start()
         else:
-            pass
+            scan_counts = self.fhs.rescan_file_list()
+            self.populate_ui_file_list_view()
+            if incremental:
+                self.report_scan_counts(scan_counts)
+
+    ### runs on the scan thread, sends each batch of found files to the ui_file_list
+    def scan_source_tree(self, incremental):
+        try:
+            scan_counts = self.fhs.rescan_file_list(
+                on_files_found=lambda start_index, file_data_batch: wx.CallAfter(
+                    self.append_ui_file_list_view, start_index, file_data_batch
+                )
+            )
+        except OSError as error:
+            logger.error(f"{self.fhs.get_source_location}, {error}, source scan FAILED")
+            scan_counts = None
+        wx.CallAfter(self.source_scan_complete, scan_counts, incremental)
+
+    def source_scan_complete(self, scan_counts, incremental):
+        self.source_scanning = False
+        self.file_list_status()
+        if incremental and scan_counts is not None:
+            self.report_scan_counts(scan_counts)
+        if not self.operation_running:
+            self.set_source_button.Enable(True)
+            self.refresh_state_button.Enable(True)
+
+    ### publisher sends the changes found by an incremental scan to the live_reporting_status_bar
+    def report_scan_counts(self, scan_counts):
+        added, removed, changed = scan_counts
+        pub.sendMessage(
+            "status_message_update",
+            message=f"{added} added, {removed} removed, {changed} changed",
+            column=1,
+        )
 
     ### populates the ui_file_list view with the filehashingservice.file_data_list
     def populate_ui_file_list_view(self):
-        if len(self.fhs.file_data_list) != 0:
-            for file_index, file_data in enumerate(self.fhs.file_data_list, start=0):
-                self.ui_file_list.InsertItem(file_index, file_data["filename"])
-                self.set_item_labels(file_index, file_data)
-                self.ui_list_row_colour(file_index)
+        self.append_ui_file_list_view(0, self.fhs.file_data_list)
+        self.file_list_status()
+
+    ### shows file data added to the end of the filehashingservice.file_data_list in the ui_file_list view
+    def append_ui_file_list_view(self, start_index, file_data_batch):
+        self.ui_file_list.set_file_data_list(
+            self.fhs.file_data_list,
+            self.fhs.empty_state,
+            item_count=start_index + len(file_data_batch),
+        )  # the scan thread may have found more files than have been sent to the ui_file_list
+
+        ### files can be selected and processed as soon as the first are listed
+        if start_index == 0 and len(file_data_batch) != 0:
+            self.enable_buttons()
 
+    def file_list_status(self):
+        if len(self.fhs.file_data_list) != 0:
             ### publisher sends the number of files found and the number of files with checksums to live_reporting_status_bar
             total_files = len(self.fhs.file_data_list)
             no_hash = [data["hash"] for data in self.fhs.file_data_list].count(
@@ -444,11 +778,8 @@ class AcaInterface(wx.Panel):
     
     def sort_list_processor(self, sorted_list_type):
         self.fhs.file_data_list = sorted_list_type # update file_data_list with sorted list
-        self.ui_file_list.DeleteAllItems()
-        for file_index, file_data in enumerate(sorted_list_type, start=0):
-            self.ui_file_list.InsertItem(file_index, file_data["filename"])
-            self.set_item_labels(file_index, file_data)
-            self.ui_list_row_colour(file_index)
+        self.ui_file_list.SetItemState(-1, 0, wx.LIST_STATE_SELECTED)  # selections don't follow the files to their sorted rows
+        self.ui_file_list.set_file_data_list(sorted_list_type, self.fhs.empty_state)
     
     ### list sorting functions
     def on_alpha_sort(self, event):
@@ -500,57 +831,146 @@ class AcaInterface(wx.Panel):
         with wx.DirDialog(
             self,
             "Choose a directory:",
-            defaultPath=self.selected_destination_location,
+            defaultPath=self.selected_destination_locations[0] if self.selected_destination_locations else os.getcwd(),
             style=wx.DD_DEFAULT_STYLE,
         ) as dialog:
             if dialog.ShowModal() == wx.ID_OK:
-                self.selected_destination_location = dialog.GetPath()
-                self.destination_location.write(self.selected_destination_location)
+                self.destination_location.write(dialog.GetPath())
 
                 self.capture_destination_location()
 
-    ### add selected item in ui_file_list to selected_items list for processing
-    def ui_file_list_item_selected(self, event):
-        index = event.GetIndex()
-        data = self.ui_file_list.GetItem(index, 1).GetText()
-        if index not in self.selected_items:
-            self.selected_items.append(index)
+    ### open the destination location dialog to add another destination to the destination_location textctrl
+    def add_destination_location(self, event):
+        with wx.DirDialog(
+            self,
+            "Choose another destination directory:",
+            defaultPath=self.selected_destination_locations[-1] if self.selected_destination_locations else os.getcwd(),
+            style=wx.DD_DEFAULT_STYLE,
+        ) as dialog:
+            if dialog.ShowModal() == wx.ID_OK:
+                destination_locations = parse_destination_locations(self.destination_location.GetValue())
+                if dialog.GetPath() not in destination_locations:
+                    destination_locations.append(dialog.GetPath())
+                self.destination_location.SetValue(destination_separator.join(destination_locations))
 
-    ### remove deselected item in ui_file_list from the selected_items list
-    def ui_file_list_item_deselected(self, event):
-        index = event.GetIndex()
-        if index in self.selected_items:
-            self.selected_items.remove(index)
+                self.capture_destination_location()
 
-    ### Insert a new item into the ui_file_list view
-    def insert_list_view(self, file_index, file_data):
-        self.ui_file_list.DeleteItem(file_index)
-        self.ui_file_list.InsertItem(file_index, file_data["filename"])
-        self.set_item_labels(file_index, file_data)
+    ### get the selected items in ui_file_list for processing
+    def get_selected_items(self):
+        selected_items = []
+        index = self.ui_file_list.GetFirstSelected()
+        while index != -1:
+            selected_items.append(index)
+            index = self.ui_file_list.GetNextSelected(index)
+        return selected_items
 
-        self.ui_list_row_colour(file_index)
+    ### redraw an item in the ui_file_list view after its file data has changed
+    def insert_list_view(self, file_index, file_data):
+        self.ui_file_list.RefreshItem(file_index)
 
     ### Update the status column symbols (o, -, x)
     def update_status(self, file_index, column_no, status):
-        self.ui_file_list.SetItem(file_index, column=column_no, label=status)
+        self.fhs.file_data_list[file_index].setdefault("status", {})[column_no] = status
+        self.ui_file_list.RefreshItem(file_index)
 
     ### subscribes to filehashingservice publisher to receive file data to update progress_bar
     def update_progress_bar(
-        self, file_data, file_size, byte_section, progress_bar_refactor
+        self, file_data, file_size, byte_section, process, bytes_per_second
     ):
-        percent = int(((byte_section / file_size) * 100) / self.progress_bar_division)
-        if self.progress_bar_division != 1:
-            percent += progress_bar_refactor
+        ### adjust progress_bar start point according to order of process in progress_phases (generate (0) > copy (33.3) > verify (66.6))
+        if process in self.progress_phases:
+            phase_index = self.progress_phases.index(process)
+        else:
+            phase_index = 0
+        percent = (
+            (byte_section / file_size) * 100 + phase_index * 100
+        ) / len(self.progress_phases)
 
         self.progress_bar.SetValue(round(percent))
 
         ### publisher sends file progress updates to the live_reporting_status_bar
         pub.sendMessage(
             "status_message_update",
-            message=f"Current File: {round(percent)}%  |  {file_data['filename']}",
+            message=f"Current File: {round(percent)}%  |  {bytes_per_second / 1000000:.1f} MB/s  |  {file_data['filename']}",
             column=0,
         )
 
+    ### add a file to a Report page status list from a file_scheduler worker
+    def report_file(self, report_list, filename):
+        with self.report_lock:
+            report_list.append(filename)
+
+    ### name of a file in the Report page lists, the full path when files are copied to several destinations
+    def get_report_name(self, filename, location):
+        if len(self.selected_destination_locations) > 1 and location != self.selected_source_location:
+            return os.path.join(location, filename)
+        return filename
+
+    ### count a copy or verify result at a destination for the Report page from a file_scheduler worker
+    def report_destination(self, location, process, status):
+        with self.report_lock:
+            process_counts = self.destination_results.setdefault(location, {}).setdefault(process, {})
+            process_counts[status] = process_counts.get(status, 0) + 1
+
+    ### add a file operation result to the Report page timings from a file_scheduler worker
+    def report_timing(self, result):
+        with self.report_lock:
+            self.file_results.append(result)
+
+    ### count a finished file and report the total progress, files finish in any order when run in parallel
+    def complete_item(self, max_value):
+        with self.report_lock:
+            self.completed_items += 1
+            if self.completed_items == max_value:
+                self.sync_pending()  # the last batch of written files is on disk before the operation is reported complete
+            wx.CallAfter(
+                self.update_total_progress, self.completed_items, max_value
+            )  # queued inside the lock so progress updates arrive in order
+
+    ### sync the files still waiting in the sync batch in batch durability, files that couldn't be synced may not survive a crash
+    def sync_pending(self):
+        for path, error in self.fhs.sync_pending():
+            logger.critical(f"{path}, sync failed, {error}")
+
+    ### apply the current settings to the file_scheduler and reset the progress count before file operations
+    def prepare_file_jobs(self):
+        file_scheduler.configure(
+            self.settings["max_workers"],
+            rotational_streams=self.settings["rotational_streams"],
+            solid_state_streams=self.settings["solid_state_streams"],
+        )
+        self.completed_items = 0
+        self.fhs.full_verify_bytes = 0  # the full verify budget is for each run
+
+    ### record the copy in the job journal, an unfinished job copying the same source to the same destinations is resumed
+    ### so files it copied are skipped and partly copied files continue from their last checkpoint
+    def start_copy_job(self):
+        self.fhs.job = None
+        if self.job_journal is None:
+            return
+        try:
+            job = self.job_journal.find_unfinished_job(self.selected_source_location, self.selected_destination_locations)
+            if job is None:
+                job = self.job_journal.create_job(
+                    self.selected_source_location, self.selected_destination_locations, dict(self.settings)
+                )
+            else:
+                logger.info(f"resuming copy job {job.job_id}")
+        except sqlite3.Error:
+            return  # the copy runs without the journal
+        self.fhs.job = job
+
+    ### finish the copy job once every file is copied and verified, a job with failures is kept so the next copy resumes it
+    def finish_copy_job(self):
+        job = self.fhs.job
+        self.fhs.job = None
+        if len(self.copy_fail) > 0 or len(self.verify_fail) > 0:
+            return
+        try:
+            job.finish()
+        except sqlite3.Error:
+            pass
+
     ### reports the total file operations progress to the user
     def update_total_progress(self, current_item, max_value):
         total_progress = int((current_item / max_value) * 100)
@@ -599,176 +1019,268 @@ class AcaInterface(wx.Panel):
                 ],
             )
 
+            ### publisher sends the pass, skip and fail counts of each destination to the Report page
+            pub.sendMessage(
+                "destination_results_report_update",
+                data={
+                    location: self.destination_results[location]
+                    for location in self.selected_destination_locations
+                    if location in self.destination_results
+                },
+            )
+
+            ### publisher sends the throughput, phase times and slowest files to the Report page
+            pub.sendMessage(
+                "timing_report_update",
+                data=(filehashingservice.summarise_timings(self.file_results), self.end_time),
+            )
+
+            if getattr(self.fhs, "job", None) is not None:
+                self.finish_copy_job()
+
             ### clears Report page lists
             self.selected_items.clear()
-            self.generate_complete.clear()
-            self.generate_skip.clear()
-            self.copy_complete.clear()
-            self.copy_skip.clear()
-            self.copy_fail.clear()
-            self.verify_complete.clear()
-            self.verify_skip.clear()
-            self.verify_fail.clear()
+            with self.report_lock:
+                self.file_results.clear()
+                self.destination_results.clear()
+                self.generate_complete.clear()
+                self.generate_skip.clear()
+                self.copy_complete.clear()
+                self.copy_skip.clear()
+                self.copy_fail.clear()
+                self.verify_complete.clear()
+                self.verify_skip.clear()
+                self.verify_fail.clear()
+
+            ### settings changed during the operation apply from the next one
+            self.apply_settings()
 
             ### reset intial button access on 100% complete
             self.initial_button_access()
 
+    ### create a FAIL result for a file whose operation raised an error, the file is reported as failed and its worker carries on
+    def error_result(self, file_data, process, error, location=None):
+        return filehashingservice.FileResult(
+            file_data["filename"], process, filehashingservice.FAIL, message=f"{process} failed, {error}", location=location, error=error
+        )
+
     ### run filehashingservice to generate file checksums
-    def on_generate(self, current_item, max_value, file_index, file_data):
-        self.column_no = 2
-        if file_data["hash"] == self.fhs.empty_state:
-            self.fhs.generate_hash(file_data)
+    def on_generate(self, max_value, file_index, file_data):
+        try:
+            try:
+                result = self.fhs.generate_hash(file_data)
+            except OSError as e:
+                result = self.error_result(file_data, "generate", e)
+            self.show_generate_result(file_index, file_data, result)
+        finally:
+            self.complete_item(max_value)  # the operation completes even if a file couldn't be shown
+
+    ### show a filehashingservice generate result in the ui_file_list, log and Report page
+    def show_generate_result(self, file_index, file_data, result):
+        column_no = 2
+        if result.passed:
             wx.CallAfter(self.insert_list_view, file_index, file_data)
             wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.pass_status
+                self.update_status, file_index, column_no, self.pass_status
             )
-            wx.CallAfter(self.update_total_progress, current_item, max_value)
-            logger.info(f"{file_data['filename']}, {file_data['hash']}, generated")
-
-            self.generate_complete.append(file_data["filename"])
-        else:
+            detail = result.message or "generated"  # checksums generated by a copy read say so in their message
+            if result.from_cache:
+                detail += " from cache"
+            logger.info(f"{result.filename}, {result.digest}, {detail} in {result.format_timing()}")
+            self.report_timing(result)
+            self.report_file(self.generate_complete, result.filename)
+        elif result.status == filehashingservice.FAIL:
             wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.ignore_status
-            )
-            wx.CallAfter(self.update_total_progress, current_item, max_value)
-            logger.info(
-                f"{file_data['filename']}, {file_data['hash']}, skipped generate"
+                self.update_status, file_index, column_no, self.fail_status
             )
-            self.generate_skip.append(file_data["filename"])
-
-    ### run filehashingservice to verify checksums
-    def on_verify(self, current_item, max_value, file_index, file_data, location):
-        self.column_no = 4
-        if file_data["hash"] == self.fhs.empty_state:
+            logger.critical(f"{result.filename}, {result.message}, FAILED generate")
+            self.report_file(self.generate_skip, result.filename)
+        else:
             wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.ignore_status
+                self.update_status, file_index, column_no, self.ignore_status
             )
-            wx.CallAfter(self.update_total_progress, current_item, max_value)
-            logger.info(f"{file_data['filename']}, no hash, skipped verify")
-            self.verify_skip.append(file_data["filename"])
-
-        else:
-            self.fhs.verify_files(file_data, location)
-            if self.fhs.hash_verified:
-                wx.CallAfter(
-                    self.update_status, file_index, self.column_no, self.pass_status
-                )
-                wx.CallAfter(self.update_total_progress, current_item, max_value)
-                logger.info(f"{file_data['filename']}, {file_data['hash']}, verified")
-                self.verify_complete.append(file_data["filename"])
-            else:
-                wx.CallAfter(
-                    self.update_status, file_index, self.column_no, self.fail_status
+            logger.info(f"{result.filename}, {result.digest}, skipped generate")
+            self.report_file(self.generate_skip, result.filename)
+
+    ### run filehashingservice to generate checksums for a batch of small files in the process pool
+    ### if the worker process hashing the batch dies every file of the batch fails
+    def on_generate_batch(self, max_value, file_batch):
+        process_pool = get_process_pool_executor()
+        completed_files = 0
+        try:
+            try:
+                results = self.fhs.generate_hash_batch(
+                    [file_data for file_index, file_data in file_batch], process_pool
                 )
-                logger.critical(
-                    f"{file_data['filename']}, {file_data['hash']}, FAILED verification"
-                )
-                self.verify_fail.append(file_data["filename"])
-
-                wx.CallAfter(self.update_total_progress, current_item, max_value)
-
-    ### run filehashingservice to generate, copy and verify checksums
-    def on_copy(self, current_item, max_value, file_index, file_data):
-        self.progress_bar.SetValue(0)
-
-        ### service to generate checksums
-        self.column_no = 2
-        if file_data["hash"] == self.fhs.empty_state:
-            self.fhs.generate_hash(file_data)
+            except BrokenProcessPool as e:
+                restart_process_pool_executor(process_pool)
+                results = [self.error_result(file_data, "generate", e) for file_index, file_data in file_batch]
+            except OSError as e:
+                results = [self.error_result(file_data, "generate", e) for file_index, file_data in file_batch]
+            for (file_index, file_data), result in zip(file_batch, results):
+                self.show_generate_result(file_index, file_data, result)
+                completed_files += 1
+                self.complete_item(max_value)
+        finally:
+            for file_index, file_data in file_batch[completed_files:]:
+                self.complete_item(max_value)  # the operation completes even if a file couldn't be shown
+
+    ### send a batch of small files to the process pool through the file_scheduler
+    def submit_generate_batch(self, max_value, file_batch):
+        file_scheduler.submit(
+            self.on_generate_batch,
+            max_value,
+            file_batch,
+            paths=[self.selected_source_location],
+        )
 
-            wx.CallAfter(self.insert_list_view, file_index, file_data)
+    ### run filehashingservice to verify checksums
+    def on_verify(self, max_value, file_index, file_data, location):
+        column_no = 4
+        try:
+            status = self.verify_location(file_data, location)
             wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.pass_status
+                self.update_status, file_index, column_no, self.status_symbols[status]
             )
-            logger.info(f"{file_data['filename']}, {file_data['hash']}, generated")
-            self.generate_complete.append(file_data["filename"])
+        finally:
+            self.complete_item(max_value)
+
+    ### verify a file in one location, log and report the result, returns the result status
+    def verify_location(self, file_data, location):
+        try:
+            result = self.fhs.verify_files(file_data, location)
+        except OSError as e:
+            result = self.error_result(file_data, "verify", e, location)
+        self.show_verify_result(file_data, result)
+        return result.status
+
+    ### log and report a filehashingservice verify result
+    def show_verify_result(self, file_data, result):
+        report_name = self.get_report_name(file_data["filename"], result.location)
+        if result.status == filehashingservice.SKIP:
+            logger.warning(f"{file_data['filename']}, {result.message}, skipped verify")
+            self.report_file(self.verify_skip, report_name)
+
+        elif result.passed:
+            if result.from_cache:
+                logger.info(f"{result.filename}, {result.digest}, verified from cache in {result.format_timing()}")
+            elif result.message:
+                logger.info(f"{result.filename}, {result.digest}, verified ({result.message}) in {result.format_timing()}")
+            else:
+                logger.info(f"{result.filename}, {result.digest}, verified in {result.format_timing()}")
+            self.report_timing(result)
+            self.report_file(self.verify_complete, report_name)
 
         else:
-            wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.ignore_status
+            logger.critical(
+                f"{result.filename}, {result.digest}, FAILED verification, {result.message} in {result.format_timing()}"
             )
+            self.report_timing(result)
+            self.report_file(self.verify_fail, report_name)
+
+    ### log a filehashingservice block repair result
+    def show_repair_result(self, result):
+        if result.passed:
+            logger.info(f"{result.filename}, {result.message}, repaired in {result.format_timing()}")
+            self.report_timing(result)
+        else:
+            logger.critical(f"{result.filename}, {result.message}, FAILED repair")
+
+    ### log and report a filehashingservice copy result of one destination
+    def show_copy_result(self, file_data, result):
+        report_name = self.get_report_name(file_data["filename"], result.location)
+        if result.passed:
             logger.info(
-                f"{file_data['filename']}, {file_data['hash']}, skipped generate"
+                f"{file_data['filename']}, source: {self.selected_source_location}, destination: {result.location}, successfully copied in {result.format_timing()}"
             )
-            self.generate_skip.append(file_data["filename"])
-
-        ### service to copy files
-        self.column_no = 3
-        file_destination_check = os.path.join(
-            self.selected_destination_location, file_data["filename"]
-        )
-
-        ### check if destination is still available before copy
-        if not os.path.exists(self.selected_destination_location):
-            pub.sendMessage(
+            self.report_timing(result)
+            self.report_file(self.copy_complete, report_name)
+        elif result.status == filehashingservice.SKIP:
+            wx.CallAfter(
+                pub.sendMessage,
                 "status_message_update",
-                message=f"{self.selected_destination_location} not available",
+                message=f"{file_data['filename']} {result.message}",
                 column=0,
             )
+            logger.warning(f"{file_data['filename']}, {result.message}, skipped copy")
+            self.report_file(self.copy_skip, report_name)
+        else:
             wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.fail_status
-            )
-            logger.critical(
-                f"{self.selected_destination_location}, not available, FAILED copy"
-            )
-            self.copy_fail("copy_report_update", data=file_data["filename"])
-
-        ### check if file exists in destination before copy and skips if true
-        elif os.path.isfile(file_destination_check):
-            pub.sendMessage(
+                pub.sendMessage,
                 "status_message_update",
-                message=f"{file_data['filename']} EXISTS",
+                message=result.message,
                 column=0,
             )
+            logger.critical(f"{file_data['filename']}, {result.message}, FAILED copy")
+            self.report_file(self.copy_fail, report_name)
+        self.report_destination(result.location, "copy", result.status)
+
+    ### run filehashingservice to generate, copy and verify checksums, and show each result as it happens
+    ### the file is read once and written to every destination that doesn't have it, each destination is verified on its own
+    def on_copy(self, max_value, file_index, file_data):
+        wx.CallAfter(self.progress_bar.SetValue, 0)
+
+        destination_locations = list(self.selected_destination_locations)
+        copy_statuses = []  # status of each destination copy, in the order of destination_locations
+        verify_statuses = []
+        verified_locations = []
+        try:
+            try:
+                for result in self.fhs.copy_and_verify(file_data, destination_locations):
+                    if result.process == "generate":
+                        self.show_generate_result(file_index, file_data, result)
+                    elif result.process == "copy":
+                        self.show_copy_result(file_data, result)
+                        copy_statuses.append(result.status)
+                        if len(copy_statuses) == len(destination_locations):  # every copy is shown before the destinations are verified
+                            wx.CallAfter(
+                                self.update_status, file_index, 3, self.combine_statuses(copy_statuses)
+                            )
+                    elif result.process == "repair":
+                        self.show_repair_result(result)
+                    else:
+                        self.show_verify_result(file_data, result)
+                        self.report_destination(result.location, "verify", result.status)
+                        verify_statuses.append(result.status)
+                        verified_locations.append(result.location)
+
+            ### the source couldn't be read before the copies were shown, or a destination couldn't be read while it was verified
+            except OSError as e:
+                if len(copy_statuses) < len(destination_locations):
+                    for location in destination_locations[len(copy_statuses):]:
+                        result = self.error_result(file_data, "copy", e, location)
+                        self.show_copy_result(file_data, result)
+                        copy_statuses.append(result.status)
+                    wx.CallAfter(
+                        self.update_status, file_index, 3, self.combine_statuses(copy_statuses)
+                    )
+                else:
+                    location = next(
+                        (
+                            location
+                            for location, copy_status in zip(destination_locations, copy_statuses)
+                            if copy_status != filehashingservice.FAIL and location not in verified_locations
+                        ),
+                        destination_locations[-1],
+                    )  # destinations are verified in order, failed copies aren't verified
+                    result = self.error_result(file_data, "verify", e, location)
+                    self.show_verify_result(file_data, result)
+                    self.report_destination(location, "verify", result.status)
+                    verify_statuses.append(result.status)
 
             wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.ignore_status
+                self.update_status, file_index, 4, self.combine_statuses(verify_statuses)
             )
+        finally:
+            self.complete_item(max_value)  # the operation completes even if a file couldn't be shown
 
-            logger.warning(
-                f"{file_data['filename']}, exists in {self.selected_destination_location}, skipped copy"
-            )
-            self.copy_skip.append(file_data["filename"])
-
-            ### service to verify existing file checksum if present in destination
-            if os.path.isfile(f"{file_destination_check}.md5"):
-                self.on_verify(
-                    current_item,
-                    max_value,
-                    file_index,
-                    file_data,
-                    self.selected_destination_location,
-                )
-            else:
-                ### skips verification if file in destination has no pre-existing checksum file
-                self.column_no = 4
-                wx.CallAfter(
-                    self.update_status, file_index, self.column_no, self.ignore_status
-                )
-                logger.warning(
-                    f"{file_data['filename']}, has no checksum in {self.selected_destination_location}, skipped verify"
-                )
-                self.verify_skip.append(file_data["filename"])
-
-        else:
-            ### service to copy file if not in destination
-            self.fhs.copy_file(file_data, self.selected_destination_location)
-            wx.CallAfter(
-                self.update_status, file_index, self.column_no, self.pass_status
-            )
-            logger.info(
-                f"{file_data['filename']}, source: {self.selected_source_location}, destination: {self.selected_destination_location}, successfully copied"
-            )
-            self.copy_complete.append(file_data["filename"])
-
-            ### service to verify file at destination after copy
-            self.on_verify(
-                current_item,
-                max_value,
-                file_index,
-                file_data,
-                self.selected_destination_location,
-            )
+    ### get the list view symbol of a file copied to or verified at several destinations, failed if any failed
+    def combine_statuses(self, statuses):
+        if filehashingservice.FAIL in statuses:
+            return self.fail_status
+        if filehashingservice.PASS in statuses:
+            return self.pass_status
+        return self.ignore_status
 
     def on_button_press(self, event):
         button_label = event.GetEventObject().GetLabel()
@@ -780,12 +1292,20 @@ class AcaInterface(wx.Panel):
             pub.sendMessage("status_message_update", message="", column=0)
             pub.sendMessage("status_message_update", message="", column=1)
             self.progress_bar.SetValue(0)
-            self.capture_source_location()
+
+            ### rescan the same source location incrementally, only new or changed files are read again
+            if (
+                hasattr(self, "fhs")
+                and self.fhs.get_source_location == self.source_location.GetValue()
+                and os.path.exists(self.fhs.get_source_location)
+            ):
+                self.scan_source_location(incremental=True)
+            else:
+                self.capture_source_location()
 
         ### user selects all items in ui_file_list
         elif button_label == self.select_all_button_label:
-            for file_index in range(self.ui_file_list.GetItemCount()):
-                self.ui_file_list.Select(file_index)
+            self.ui_file_list.SetItemState(-1, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
 
         ### user clears selected items in ui_file_list
         elif button_label == self.clear_selected_button_label:
@@ -795,6 +1315,7 @@ class AcaInterface(wx.Panel):
         ### user selects generate file checksums
         elif button_label == self.generate_button_label:
             logger.info(f"user selected generate")
+            self.selected_items = self.get_selected_items()
 
             ### disable buttons during file operations
             self.disable_buttons()
@@ -803,42 +1324,54 @@ class AcaInterface(wx.Panel):
 
             pub.sendMessage("status_message_update", message="", column=1)
 
-            self.progress_bar_division = 1
+            self.progress_phases = ["generate"]
             self.progress_bar.SetValue(0)
 
             if len(self.selected_items) > 0:
                 max_value = len(
                     self.selected_items
                 )  # set the item range for the progress bar
-                current_item = 0  # set item number variable to update progress bar, -1 starts the count from 0
+                self.prepare_file_jobs()
                 pub.sendMessage(
                     "status_message_update",
-                    message=f"Total Progress: 0%  |  {current_item} of {max_value} Files Complete",
+                    message=f"Total Progress: 0%  |  0 of {max_value} Files Complete",
                     column=1,
                 )
+                file_batch = []  # small files are hashed in batches in the process pool
                 for index in sorted(self.selected_items):
-                    current_item += (
-                        1  # increment with each item to update the progress bar
-                    )
                     file_data = self.fhs.file_data_list[index]
-                    thread_pool_executor.submit(
+                    if (
+                        self.settings["process_pool_hashing"]
+                        and file_data["hash"] == self.fhs.empty_state
+                        and file_data["size"] <= small_file_size
+                    ):
+                        file_batch.append((index, file_data))
+                        if len(file_batch) == small_file_batch_size:
+                            self.submit_generate_batch(max_value, file_batch)
+                            file_batch = []
+                        continue
+
+                    file_scheduler.submit(
                         self.on_generate,
-                        current_item,
                         max_value,
                         index,
                         file_data,
+                        paths=[os.path.join(self.selected_source_location, file_data["filename"])],
                     )
+                if len(file_batch) > 0:
+                    self.submit_generate_batch(max_value, file_batch)
             else:
                 pass
 
         ### user selects to generate checksums, copy, verify files
         elif button_label == self.copy_button_label:
             logger.info(f"user selected generate: copy: verify")
+            self.selected_items = self.get_selected_items()
 
             self.capture_destination_location()
 
-            # check destination path is valid before proceeding
-            if os.path.exists(self.selected_destination_location):
+            # check every destination path is valid before proceeding
+            if self.destinations_available():
                 
                 ### disable buttons during file operations
                 self.disable_buttons()
@@ -847,14 +1380,20 @@ class AcaInterface(wx.Panel):
 
                 pub.sendMessage("status_message_update", message="", column=1)
 
-                self.progress_bar_division = 3
+                ### generate is part of the copy read in single pass mode
+                self.progress_phases = ["copy"]
+                if not self.settings["single_pass_copy"]:
+                    self.progress_phases.insert(0, "generate")
+                if self.settings["verify_after_copy"]:
+                    self.progress_phases.append("verify")
                 self.progress_bar.SetValue(0)
 
                 if len(self.selected_items) > 0:
                     max_value = len(
                         self.selected_items
                     )  # set the item range for the progress bar
-                    current_item = 0  # set item number variable to update progress bar
+                    self.prepare_file_jobs()
+                    self.start_copy_job()
                     pub.sendMessage(
                         "status_message_update",
                         message=f"Total Progress: 0%  |  0 of {max_value} Files Complete",
@@ -862,24 +1401,26 @@ class AcaInterface(wx.Panel):
                     )
 
                     for index in sorted(self.selected_items):
-                        current_item += (
-                            1  # increment with each item to update the progress bar
-                        )
                         file_data = self.fhs.file_data_list[index]
-                        thread_pool_executor.submit(
+                        file_scheduler.submit(
                             self.on_copy,
-                            current_item,
                             max_value,
                             index,
                             file_data,
+                            paths=[os.path.join(self.selected_source_location, file_data["filename"])]
+                            + [
+                                os.path.join(location, file_data["filename"])
+                                for location in self.selected_destination_locations
+                            ],
                         )
             else:
-                # exit process if select_destination_location path is not valid
+                # exit process if a selected_destination_locations path is not valid
                 pass
 
         ### user selects verify file checksums
         elif button_label == self.verify_button_label:
             logger.info(f"user selected verify")
+            self.selected_items = self.get_selected_items()
 
             ### disable buttons during file operations
             self.disable_buttons()
@@ -888,31 +1429,28 @@ class AcaInterface(wx.Panel):
 
             pub.sendMessage("status_message_update", message="", column=1)
 
-            self.progress_bar_division = 1
+            self.progress_phases = ["verify"]
             self.progress_bar.SetValue(0)
 
             if len(self.selected_items) > 0:
                 max_value = len(
                     self.selected_items
                 )  # set the item range for the progress bar
-                current_item = 0  # set item number variable to update progress bar
+                self.prepare_file_jobs()
                 pub.sendMessage(
                     "status_message_update",
-                    message=f"Total Progress: 0%  |  {current_item} of {max_value} Files Complete",
+                    message=f"Total Progress: 0%  |  0 of {max_value} Files Complete",
                     column=1,
                 )
                 for index in sorted(self.selected_items):
-                    current_item += (
-                        1  # increment with each item to update the progress bar
-                    )
                     file_data = self.fhs.file_data_list[index]
-                    thread_pool_executor.submit(
+                    file_scheduler.submit(
                         self.on_verify,
-                        current_item,
                         max_value,
                         index,
                         file_data,
                         self.selected_source_location,
+                        paths=[os.path.join(self.selected_source_location, file_data["filename"])],
                     )
         else:
             pass
@@ -966,6 +1504,22 @@ class ReportInterface(wx.Panel):
         self.verify_fail_label = wx.StaticText(self, label="X Failed")
         self.verify_fail_stat = wx.TextCtrl(self, value="", style=wx.TE_READONLY)
 
+        self.throughput_label = wx.StaticText(self, label="Throughput")
+        self.throughput_stat = wx.TextCtrl(self, value="", style=wx.TE_READONLY)
+
+        self.bottleneck_label = wx.StaticText(self, label="Most Time Spent")
+        self.bottleneck_stat = wx.TextCtrl(self, value="", style=wx.TE_READONLY)
+
+        self.timing_stat = wx.TextCtrl(
+            self, value="", size=(-1, 170), style=wx.TE_READONLY | wx.TE_MULTILINE | wx.TE_DONTWRAP
+        )
+        self.timing_stat.SetFont(wx.Font(wx.FontInfo(11).Family(wx.FONTFAMILY_TELETYPE)))
+
+        self.destination_results_stat = wx.TextCtrl(
+            self, value="", size=(-1, 80), style=wx.TE_READONLY | wx.TE_MULTILINE | wx.TE_DONTWRAP
+        )
+        self.destination_results_stat.SetFont(wx.Font(wx.FontInfo(11).Family(wx.FONTFAMILY_TELETYPE)))
+
         stat_font = wx.Font(wx.FontInfo(13).Bold())
         self.total_files_stat.SetFont(stat_font)
         self.time_stat.SetFont(stat_font)
@@ -977,6 +1531,8 @@ class ReportInterface(wx.Panel):
         self.verify_stat.SetFont(stat_font)
         self.verify_skip_stat.SetFont(stat_font)
         self.verify_fail_stat.SetFont(stat_font)
+        self.throughput_stat.SetFont(stat_font)
+        self.bottleneck_stat.SetFont(stat_font)
 
         source_box = wx.StaticBox(self, -1, "File Locations")
         source_sizer = wx.StaticBoxSizer(source_box, wx.HORIZONTAL)
@@ -1062,11 +1618,34 @@ class ReportInterface(wx.Panel):
         verify_sizer.Add(verify_stack_2, 1, wx.EXPAND)
         verify_sizer.Add(verify_stack_3, 1, wx.EXPAND)
 
+        destination_results_box = wx.StaticBox(self, -1, "Destinations")
+        destination_results_sizer = wx.StaticBoxSizer(destination_results_box, wx.VERTICAL)
+        destination_results_sizer.Add(self.destination_results_stat, 1, wx.ALL | wx.EXPAND, 5)
+
+        timing_box = wx.StaticBox(self, -1, "Performance")
+        timing_sizer = wx.StaticBoxSizer(timing_box, wx.VERTICAL)
+        timing_row = wx.BoxSizer(wx.HORIZONTAL)
+
+        timing_stack_1 = wx.BoxSizer(wx.VERTICAL)
+        timing_stack_1.Add(self.throughput_label, 0, wx.LEFT | wx.TOP, 5)
+        timing_stack_1.Add(self.throughput_stat, 1, wx.ALL | wx.EXPAND, 5)
+
+        timing_stack_2 = wx.BoxSizer(wx.VERTICAL)
+        timing_stack_2.Add(self.bottleneck_label, 0, wx.LEFT | wx.TOP, 5)
+        timing_stack_2.Add(self.bottleneck_stat, 1, wx.ALL | wx.EXPAND, 5)
+
+        timing_row.Add(timing_stack_1, 1, wx.EXPAND)
+        timing_row.Add(timing_stack_2, 2, wx.EXPAND)
+        timing_sizer.Add(timing_row, 0, wx.EXPAND)
+        timing_sizer.Add(self.timing_stat, 1, wx.ALL | wx.EXPAND, 5)
+
         sizer = wx.BoxSizer(wx.VERTICAL)
         sizer.Add(file_sizer, 0, wx.TOP | wx.LEFT | wx.RIGHT | wx.EXPAND, 10)
         sizer.Add(generate_sizer, 0, wx.TOP | wx.LEFT | wx.RIGHT | wx.EXPAND, 10)
         sizer.Add(copy_sizer, 0, wx.TOP | wx.LEFT | wx.RIGHT | wx.EXPAND, 10)
-        sizer.Add(verify_sizer, 0, wx.ALL | wx.EXPAND, 10)
+        sizer.Add(verify_sizer, 0, wx.TOP | wx.LEFT | wx.RIGHT | wx.EXPAND, 10)
+        sizer.Add(destination_results_sizer, 0, wx.TOP | wx.LEFT | wx.RIGHT | wx.EXPAND, 10)
+        sizer.Add(timing_sizer, 0, wx.ALL | wx.EXPAND, 10)
 
         ### failed files report list
         self.report_list = wx.ListCtrl(
@@ -1114,6 +1693,8 @@ class ReportInterface(wx.Panel):
         pub.subscribe(self.copy_report, "copy_report_update")
         pub.subscribe(self.verify_report, "verify_report_update")
         pub.subscribe(self.time_report, "time_report_update")
+        pub.subscribe(self.timing_report, "timing_report_update")
+        pub.subscribe(self.destination_results_report, "destination_results_report_update")
 
         self.Show()
 
@@ -1140,6 +1721,52 @@ class ReportInterface(wx.Panel):
 
         self.time_stat.write(str(data)[:-4])
 
+    ### show the throughput, time spent in each phase and the slowest files, data is (filehashingservice.summarise_timings, elapsed seconds)
+    def timing_report(self, data):
+        timings, elapsed_seconds = data
+        self.throughput_stat.Clear()
+        self.bottleneck_stat.Clear()
+        self.timing_stat.Clear()
+
+        self.throughput_stat.write(
+            f"{timings['bytes'] / 1000000 / elapsed_seconds:.1f} MB/s" if elapsed_seconds else ""
+        )
+
+        phase_total = sum(timings["phase_times"].values())
+        if phase_total == 0:
+            return
+        busiest_phase = max(timings["phase_times"], key=timings["phase_times"].get)
+        self.bottleneck_stat.write(f"{busiest_phase} ({timing_phase_resources[busiest_phase]})")
+
+        lines = ["Time per phase, all files"]
+        for phase, seconds in timings["phase_times"].items():
+            lines.append(
+                f"  {phase:<14}{seconds:>9.2f}s {seconds / phase_total:>5.0%}  {timing_phase_resources[phase]}"
+            )
+        lines.append("")
+        lines.append("Slowest files")
+        for elapsed, process, filename, bytes_per_second in timings["slowest_files"]:
+            lines.append(f"  {elapsed:>8.3f}s {bytes_per_second / 1000000:>8.1f} MB/s  {process:<9}{filename}")
+        self.timing_stat.write("\n".join(lines))
+        self.timing_stat.SetInsertionPoint(0)
+
+    ### show the copy and verify pass, skip and fail counts of each destination, data is {destination: {process: {status: number of files}}}
+    def destination_results_report(self, data):
+        self.destination_results_stat.Clear()
+
+        lines = []
+        for location, process_counts in data.items():
+            lines.append(location)
+            for process in ("copy", "verify"):
+                status_counts = process_counts.get(process, {})
+                lines.append(
+                    f"  {process:<8}○ {status_counts.get(filehashingservice.PASS, 0):<8}"
+                    f"- {status_counts.get(filehashingservice.SKIP, 0):<8}"
+                    f"X {status_counts.get(filehashingservice.FAIL, 0)}"
+                )
+        self.destination_results_stat.write("\n".join(lines))
+        self.destination_results_stat.SetInsertionPoint(0)
+
     def generate_report(self, data):
         self.generate_stat.Clear()
         self.generate_skip_stat.Clear()
@@ -1170,22 +1797,23 @@ class ReportInterface(wx.Panel):
         if len(data[2]) > 0:
             for index in range(len(data[2])):
                 self.report_list.InsertItem(index, data[2][index])
-                self.report_list.SetiItem(index, column=1, label="COPY")
+                self.report_list.SetItem(index, column=1, label="COPY")
                 self.report_list_row_colour(index)
 
     def verify_report(self, data):
         self.verify_stat.Clear()
         self.verify_skip_stat.Clear()
         self.verify_fail_stat.Clear()
-        self.report_list.DeleteAllItems()
 
         self.verify_stat.write(str(len(data[0])))
         self.verify_skip_stat.write(str(len(data[1])))
         self.verify_fail_stat.write(str(len(data[2])))
 
+        ### verify failures are listed after the copy failures, the list is cleared by copy_report
         if len(data[2]) > 0:
-            for index in range(len(data[2])):
-                self.report_list.InsertItem(index, data[2][index])
+            for filename in data[2]:
+                index = self.report_list.GetItemCount()
+                self.report_list.InsertItem(index, filename)
                 self.report_list.SetItem(index, column=1, label="VERIFY")
                 self.report_list_row_colour(index)
 
@@ -1208,7 +1836,243 @@ class ReportInterface(wx.Panel):
         pyperclip.copy("\n".join(list_capture))
 
 
+### Settings page UI
+class SettingsInterface(wx.Panel):
+    def __init__(self, parent):
+        wx.Panel.__init__(self, parent)
+
+        ### Settings page UI elements
+        self.single_pass_copy_checkbox = self.setting_checkbox(
+            "single_pass_copy", "Generate checksums while copying (single read of the source)"
+        )
+        self.verify_after_copy_checkbox = self.setting_checkbox(
+            "verify_after_copy", "Verify files at the destination after copy"
+        )
+        self.process_pool_hashing_checkbox = self.setting_checkbox(
+            "process_pool_hashing", "Generate checksums for small files on all CPU cores"
+        )
+        self.recursive_checkbox = self.setting_checkbox(
+            "recursive", "Include files in subfolders (copies recreate the subfolders at the destination)"
+        )
+        self.quick_verify_checkbox = self.setting_checkbox(
+            "quick_verify", "Quick mode: use cached checksums for files unchanged since they were last read"
+        )
+
+        self.max_workers_label = wx.StaticText(self, label="Files processed at once")
+        self.max_workers_spin = self.setting_spin_ctrl("max_workers", 1, 64)
+
+        self.rotational_streams_label = wx.StaticText(self, label="Files per hard disk drive")
+        self.rotational_streams_spin = self.setting_spin_ctrl("rotational_streams", 1, 16)
+
+        self.solid_state_streams_label = wx.StaticText(self, label="Files per solid state drive")
+        self.solid_state_streams_spin = self.setting_spin_ctrl("solid_state_streams", 1, 64)
+
+        self.checksum_algorithm_label = wx.StaticText(self, label="Checksum algorithm for new checksum files")
+        self.checksum_algorithm_choice = self.setting_choice("checksum_algorithm", checksum_algorithm_choices)
+
+        self.manifest_mode_checkbox = self.setting_checkbox(
+            "manifest_mode", "Write one checksum list per folder (checksums.md5) instead of a checksum file per file"
+        )
+
+        self.block_hashes_checkbox = self.setting_checkbox(
+            "block_hashes", "Write block checksums for large files (verify blocks in parallel, recopy only corrupt blocks)"
+        )
+
+        self.additional_checksum_algorithms_label = wx.StaticText(
+            self, label="Also generate from the same read (each written to its own checksum file)"
+        )
+        self.additional_checksum_algorithms_list = self.setting_check_list(
+            "additional_checksum_algorithms", checksum_algorithm_choices
+        )
+
+        self.sample_blocks_label = wx.StaticText(
+            self, label="Blocks read from each unchanged file with block checksums (0 verifies every file in full)"
+        )
+        self.sample_blocks_spin = self.setting_spin_ctrl("sample_blocks", 0, 64)
+
+        self.full_verify_days_label = wx.StaticText(self, label="Days between full verifies of sampled files")
+        self.full_verify_days_spin = self.setting_spin_ctrl("full_verify_days", 1, 3650)
+
+        self.full_verify_budget_label = wx.StaticText(self, label="GB of full verifies in each run (0 for no limit)")
+        self.full_verify_budget_spin = self.setting_spin_ctrl("full_verify_budget", 0, 1000000)
+
+        self.rate_limit_label = wx.StaticText(self, label="Bandwidth limit in MB/s, can be changed while files are processed (0 for no limit)")
+        self.rate_limit_spin = self.setting_spin_ctrl("rate_limit", 0, 100000)
+
+        self.nice_label = wx.StaticText(self, label="CPU priority, 0 normal to 19 lowest (Linux)")
+        self.nice_spin = self.setting_spin_ctrl("nice", 0, 19)
+
+        self.io_priority_label = wx.StaticText(self, label="Disk priority (Linux)")
+        self.io_priority_choice = self.setting_choice("io_priority", io_priority_choices)
+
+        self.durability_label = wx.StaticText(self, label="Durability of copies and checksum files")
+        self.durability_choice = self.setting_choice("durability", durability_choices)
+
+        self.sync_batch_files_label = wx.StaticText(self, label="Files written between batch syncs")
+        self.sync_batch_files_spin = self.setting_spin_ctrl("sync_batch_files", 1, 100000)
+
+        self.sync_batch_mb_label = wx.StaticText(self, label="MB written between batch syncs")
+        self.sync_batch_mb_spin = self.setting_spin_ctrl("sync_batch_mb", 1, 1000000)
+
+        self.chunk_size_label = wx.StaticText(self, label="Read chunk size")
+        self.chunk_size_choice = self.setting_choice("chunk_size", chunk_size_choices)
+
+        self.copy_buffers_label = wx.StaticText(self, label="Copy buffers (read ahead while writing)")
+        self.copy_buffers_spin = self.setting_spin_ctrl("copy_buffers", 1, 32)
+
+        self.cache_mode_label = wx.StaticText(self, label="System cache (direct I/O makes verify read the disk rather than cached data)")
+        self.cache_mode_choice = self.setting_choice("cache_mode", cache_mode_choices)
+
+        source_box = wx.StaticBox(self, -1, "Source Files")
+        source_sizer = wx.StaticBoxSizer(source_box, wx.VERTICAL)
+        source_sizer.Add(self.recursive_checkbox, 0, wx.ALL, 5)
+
+        checksum_box = wx.StaticBox(self, -1, "Checksums")
+        checksum_sizer = wx.StaticBoxSizer(checksum_box, wx.VERTICAL)
+        checksum_sizer.Add(self.checksum_algorithm_label, 0, wx.LEFT | wx.TOP, 5)
+        checksum_sizer.Add(self.checksum_algorithm_choice, 0, wx.ALL, 5)
+        checksum_sizer.Add(self.additional_checksum_algorithms_label, 0, wx.LEFT | wx.TOP, 5)
+        checksum_sizer.Add(self.additional_checksum_algorithms_list, 0, wx.ALL, 5)
+        checksum_sizer.Add(self.manifest_mode_checkbox, 0, wx.ALL, 5)
+        checksum_sizer.Add(self.block_hashes_checkbox, 0, wx.ALL, 5)
+
+        copy_box = wx.StaticBox(self, -1, "File Copy Operations")
+        copy_sizer = wx.StaticBoxSizer(copy_box, wx.VERTICAL)
+        copy_sizer.Add(self.single_pass_copy_checkbox, 0, wx.ALL, 5)
+        copy_sizer.Add(self.verify_after_copy_checkbox, 0, wx.ALL, 5)
+        copy_sizer.Add(self.durability_label, 0, wx.LEFT | wx.TOP, 5)
+        copy_sizer.Add(self.durability_choice, 0, wx.ALL, 5)
+        copy_sizer.Add(self.sync_batch_files_label, 0, wx.LEFT | wx.TOP, 5)
+        copy_sizer.Add(self.sync_batch_files_spin, 0, wx.ALL, 5)
+        copy_sizer.Add(self.sync_batch_mb_label, 0, wx.LEFT | wx.TOP, 5)
+        copy_sizer.Add(self.sync_batch_mb_spin, 0, wx.ALL, 5)
+
+        worker_box = wx.StaticBox(self, -1, "Parallel File Processing")
+        worker_sizer = wx.StaticBoxSizer(worker_box, wx.VERTICAL)
+        worker_row = wx.BoxSizer(wx.HORIZONTAL)
+
+        worker_stack_1 = wx.BoxSizer(wx.VERTICAL)
+        worker_stack_1.Add(self.max_workers_label, 0, wx.LEFT | wx.TOP, 5)
+        worker_stack_1.Add(self.max_workers_spin, 0, wx.ALL | wx.EXPAND, 5)
+
+        worker_stack_2 = wx.BoxSizer(wx.VERTICAL)
+        worker_stack_2.Add(self.rotational_streams_label, 0, wx.LEFT | wx.TOP, 5)
+        worker_stack_2.Add(self.rotational_streams_spin, 0, wx.ALL | wx.EXPAND, 5)
+
+        worker_stack_3 = wx.BoxSizer(wx.VERTICAL)
+        worker_stack_3.Add(self.solid_state_streams_label, 0, wx.LEFT | wx.TOP, 5)
+        worker_stack_3.Add(self.solid_state_streams_spin, 0, wx.ALL | wx.EXPAND, 5)
+
+        worker_row.Add(worker_stack_1, 1, wx.EXPAND)
+        worker_row.Add(worker_stack_2, 1, wx.EXPAND)
+        worker_row.Add(worker_stack_3, 1, wx.EXPAND)
+
+        worker_sizer.Add(worker_row, 0, wx.EXPAND)
+        worker_sizer.Add(self.process_pool_hashing_checkbox, 0, wx.ALL, 5)
+
+        read_box = wx.StaticBox(self, -1, "File Reading")
+        read_sizer = wx.StaticBoxSizer(read_box, wx.VERTICAL)
+        read_sizer.Add(self.chunk_size_label, 0, wx.LEFT | wx.TOP, 5)
+        read_sizer.Add(self.chunk_size_choice, 0, wx.ALL, 5)
+        read_sizer.Add(self.copy_buffers_label, 0, wx.LEFT | wx.TOP, 5)
+        read_sizer.Add(self.copy_buffers_spin, 0, wx.ALL, 5)
+        read_sizer.Add(self.cache_mode_label, 0, wx.LEFT | wx.TOP, 5)
+        read_sizer.Add(self.cache_mode_choice, 0, wx.ALL, 5)
+        read_sizer.Add(self.quick_verify_checkbox, 0, wx.ALL, 5)
+
+        sample_box = wx.StaticBox(self, -1, "Sampled Verify")
+        sample_sizer = wx.StaticBoxSizer(sample_box, wx.VERTICAL)
+        sample_sizer.Add(self.sample_blocks_label, 0, wx.LEFT | wx.TOP, 5)
+        sample_sizer.Add(self.sample_blocks_spin, 0, wx.ALL, 5)
+        sample_sizer.Add(self.full_verify_days_label, 0, wx.LEFT | wx.TOP, 5)
+        sample_sizer.Add(self.full_verify_days_spin, 0, wx.ALL, 5)
+        sample_sizer.Add(self.full_verify_budget_label, 0, wx.LEFT | wx.TOP, 5)
+        sample_sizer.Add(self.full_verify_budget_spin, 0, wx.ALL, 5)
+
+        bandwidth_box = wx.StaticBox(self, -1, "Bandwidth and Priority")
+        bandwidth_sizer = wx.StaticBoxSizer(bandwidth_box, wx.VERTICAL)
+        bandwidth_sizer.Add(self.rate_limit_label, 0, wx.LEFT | wx.TOP, 5)
+        bandwidth_sizer.Add(self.rate_limit_spin, 0, wx.ALL, 5)
+        bandwidth_sizer.Add(self.nice_label, 0, wx.LEFT | wx.TOP, 5)
+        bandwidth_sizer.Add(self.nice_spin, 0, wx.ALL, 5)
+        bandwidth_sizer.Add(self.io_priority_label, 0, wx.LEFT | wx.TOP, 5)
+        bandwidth_sizer.Add(self.io_priority_choice, 0, wx.ALL, 5)
+
+        self.settings_stack = wx.BoxSizer(wx.VERTICAL)
+        self.settings_stack.Add(source_sizer, 0, wx.ALL | wx.EXPAND, 10)
+        self.settings_stack.Add(checksum_sizer, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM | wx.EXPAND, 10)
+        self.settings_stack.Add(copy_sizer, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM | wx.EXPAND, 10)
+        self.settings_stack.Add(worker_sizer, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM | wx.EXPAND, 10)
+        self.settings_stack.Add(read_sizer, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM | wx.EXPAND, 10)
+        self.settings_stack.Add(sample_sizer, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM | wx.EXPAND, 10)
+        self.settings_stack.Add(bandwidth_sizer, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM | wx.EXPAND, 10)
+
+        self.SetSizerAndFit(self.settings_stack)
+
+        self.Show()
+
+    ### create an on/off setting control that publishes its changes
+    def setting_checkbox(self, setting, label):
+        checkbox = wx.CheckBox(self, label=label)
+        checkbox.SetValue(default_settings[setting])
+        checkbox.Bind(
+            wx.EVT_CHECKBOX,
+            lambda event: self.on_setting_change(setting, event.IsChecked()),
+        )
+        return checkbox
+
+    ### create a number setting control that publishes its changes
+    def setting_spin_ctrl(self, setting, min_value, max_value):
+        spin_ctrl = wx.SpinCtrl(
+            self, min=min_value, max=max_value, initial=default_settings[setting]
+        )
+        spin_ctrl.Bind(
+            wx.EVT_SPINCTRL,
+            lambda event: self.on_setting_change(setting, event.GetPosition()),
+        )
+        return spin_ctrl
+
+    ### create a drop down setting control from a dict of labels and values that publishes its changes
+    def setting_choice(self, setting, choices):
+        labels = list(choices)
+        choice = wx.Choice(self, choices=labels)
+        values = list(choices.values())
+        if default_settings[setting] in values:
+            choice.SetSelection(values.index(default_settings[setting]))
+        choice.Bind(
+            wx.EVT_CHOICE,
+            lambda event: self.on_setting_change(setting, choices[labels[event.GetSelection()]]),
+        )
+        return choice
+
+    ### create a multiple choice setting control from a dict of labels and values that publishes the list of checked values
+    def setting_check_list(self, setting, choices):
+        labels = list(choices)
+        check_list = wx.CheckListBox(self, choices=labels)
+        check_list.SetCheckedItems(
+            [labels.index(label) for label in labels if choices[label] in default_settings[setting]]
+        )
+        check_list.Bind(
+            wx.EVT_CHECKLISTBOX,
+            lambda event: self.on_setting_change(
+                setting, [choices[labels[index]] for index in check_list.GetCheckedItems()]
+            ),
+        )
+        return check_list
+
+    ### publisher sends setting changes to the aca page
+    def on_setting_change(self, setting, value):
+        pub.sendMessage("settings_update", setting=setting, value=value)
+
+
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # lets the packaged app start process pool workers
+
+    ### the log file is only written by the application, not the process pool workers
+    file_handler = logging.FileHandler(log_write)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
     app = wx.App()
     frame = MainUIFrame()
     frame.Show()
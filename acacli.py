@@ -0,0 +1,419 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent import futures
+
+import filehashingservice
+import hashalgorithms
+import hashcache
+import jobjournal
+import jobscheduler
+
+# exit codes, failed and error files are listed on stdout
+EXIT_OK = 0  # every file passed or was skipped
+EXIT_FAILED = 1  # one or more checksums didn't match
+EXIT_USAGE = 2  # invalid arguments or locations, also used by argparse
+EXIT_ERROR = 3  # one or more files couldn't be read or written
+EXIT_INTERRUPTED = 130
+
+# file result statuses, in the order they're counted in the summary, errors are files that raised an OSError
+PASS = filehashingservice.PASS
+SKIP = filehashingservice.SKIP
+FAIL = filehashingservice.FAIL
+ERROR = "error"
+
+
+# This class is responsible for a single line progress display on the terminal, redrawn at most every interval
+# files are added as the source is scanned, the total is shown with a + until the scan is finished
+class TerminalProgress:
+    def __init__(self, total_files=0, stream=sys.stderr, interval=0.2):
+        self.total_files = total_files
+        self.scanning = False
+        self.stream = stream
+        self.enabled = stream.isatty()  # progress isn't written to logs or pipes
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.start_time = time.perf_counter()
+        self.last_draw_time = 0
+        self.completed_files = 0
+        self.bytes_processed = 0
+        self.file_bytes = {}  # (filename, process): bytes processed of files in progress
+        self.current_file = ""
+
+    # progress_callback for the filehashingservice
+    def update(self, file_data, file_size, byte_section, process, bytes_per_second):
+        with self.lock:
+            key = (file_data["filename"], process)
+            self.bytes_processed += byte_section - self.file_bytes.get(key, 0)
+            if byte_section >= file_size:
+                self.file_bytes.pop(key, None)
+            else:
+                self.file_bytes[key] = byte_section
+            self.current_file = f"{process} {file_data['filename']}"
+            self.draw()
+
+    # add files found by the scan to the total
+    def add_files(self, file_count):
+        with self.lock:
+            self.scanning = True
+            self.total_files += file_count
+
+    def finish_scan(self):
+        with self.lock:
+            self.scanning = False
+            self.draw(force=self.completed_files == self.total_files)
+
+    def complete_file(self):
+        with self.lock:
+            self.completed_files += 1
+            self.draw(force=self.completed_files == self.total_files and not self.scanning)
+
+    # redraw the progress line, called with the lock held
+    def draw(self, force=False):
+        current_time = time.perf_counter()
+        if not self.enabled or (not force and current_time - self.last_draw_time < self.interval):
+            return
+        self.last_draw_time = current_time
+        elapsed_time = current_time - self.start_time
+        megabytes = self.bytes_processed / (1024 * 1024)
+        line = (
+            f"{self.completed_files}/{self.total_files}{'+' if self.scanning else ''} files  {megabytes:.1f} MB  "
+            f"{megabytes / elapsed_time if elapsed_time > 0 else 0:.1f} MB/s  {self.current_file}"
+        )
+        width = max(os.get_terminal_size(self.stream.fileno()).columns - 1, 20)
+        self.stream.write("\r" + line[:width].ljust(width))
+        self.stream.flush()
+
+    # clear the progress line so results and the summary start on an empty line
+    def finish(self):
+        with self.lock:
+            if self.enabled:
+                self.stream.write("\r" + " " * max(os.get_terminal_size(self.stream.fileno()).columns - 1, 20) + "\r")
+                self.stream.flush()
+
+
+# This class is responsible for running generate, copy and verify on a source directory without the GUI
+# copies are recorded in a jobjournal.Job so an interrupted copy can be resumed, job is given to resume one
+class BatchRunner:
+    def __init__(self, args, job=None):
+        self.args = args
+        self.job = job
+        self.results = []  # (status, process, filename, message)
+        self.file_results = []  # filehashingservice.FileResult of each file operation, for --timing
+        self.results_lock = threading.Lock()
+        self.hash_cache = None if args.no_cache else open_hash_cache()
+        self.fhs = filehashingservice.FileHashingService(
+            os.path.abspath(args.source),
+            chunk_size=args.chunk_size * 1024,
+            hash_cache=self.hash_cache,
+            quick_verify=args.quick,
+            recursive=args.recursive,
+            manifest_mode=args.manifest,
+            pipeline_depth=args.copy_buffers,
+        )
+        self.fhs.checksum_algorithm = args.algorithm
+        self.fhs.additional_checksum_algorithms = args.also
+        self.fhs.block_hashes = getattr(args, "blocks", False)  # jobs saved before block checksums have no blocks setting
+        self.fhs.sample_blocks = getattr(args, "sample", 0)
+        self.fhs.full_verify_interval = getattr(args, "full_every", 30) * 24 * 60 * 60
+        self.fhs.full_verify_budget = getattr(args, "full_budget", 0) * 1000 * 1000 * 1000 or None
+        self.fhs.cache_mode = getattr(args, "cache", "normal")
+        self.fhs.durability = getattr(args, "durability", "none")
+        self.fhs.sync_batch.batch_files = getattr(args, "sync_files", 64)
+        self.fhs.sync_batch.batch_bytes = getattr(args, "sync_mb", 256) * 1024 * 1024
+        self.fhs.single_pass_copy = not getattr(args, "two_pass", False)
+        self.fhs.verify_after_copy = not getattr(args, "no_verify", False)
+        self.fhs.rate_limiter.set_rate(getattr(args, "limit", 0) * 1000 * 1000 or None)
+        self.scheduler = jobscheduler.DeviceScheduler(
+            max_workers=args.workers,
+            rotational_streams=args.rotational_streams,
+            solid_state_streams=args.solid_state_streams,
+        )
+        self.scheduler.nice = getattr(args, "nice", 0)
+        self.scheduler.io_priority = getattr(args, "io_priority", "normal")
+        self.progress = None
+
+    # record a filehashingservice.FileResult
+    def report_result(self, result):
+        if result.status != SKIP:
+            with self.results_lock:
+                self.file_results.append(result)
+        self.report(result.status, result.process, result.filename, result.message or result.digest or "")
+
+    # record a file result, failed and error results are written to stdout straight away, all results with --verbose
+    def report(self, status, process, filename, message=""):
+        with self.results_lock:
+            self.results.append((status, process, filename, message))
+            if status in (FAIL, ERROR) or self.args.verbose:
+                if self.progress is not None:
+                    self.progress.finish()
+                print("\t".join(field for field in (status, process, filename, message) if field), flush=True)
+
+    # scan the source files and run the command on each in parallel, returns the exit code
+    # files are submitted in the batches the scan finds them in, so large trees start processing before the scan is finished
+    def run(self):
+        self.progress = TerminalProgress()
+        self.fhs.progress_callback = self.progress.update
+
+        if self.args.command == "copy" and self.job is None:
+            job_journal = open_job_journal()
+            if job_journal is not None:
+                self.job = job_journal.create_job(self.fhs.get_source_location, self.args.destinations, vars(self.args))
+        self.fhs.job = self.job
+
+        operation = {"generate": self.generate, "copy": self.copy, "verify": self.verify}[self.args.command]
+        destinations = getattr(self.args, "destinations", [])
+        jobs = []
+
+        def submit_files(start_index, file_data_batch):
+            self.progress.add_files(len(file_data_batch))
+            for file_data in file_data_batch:
+                paths = [os.path.join(self.fhs.get_source_location, file_data["filename"])]
+                paths.extend(os.path.join(destination, file_data["filename"]) for destination in destinations)
+                jobs.append(self.scheduler.submit(self.run_job, operation, file_data, paths=paths))
+
+        completed = False
+        try:
+            self.fhs.get_file_list(on_files_found=submit_files)
+            self.progress.finish_scan()
+            for job_future in futures.as_completed(jobs):
+                job_future.result()
+            completed = True
+        except KeyboardInterrupt:
+            self.progress.finish()
+            print("interrupted, waiting for files in progress", file=sys.stderr)
+            return EXIT_INTERRUPTED
+        finally:
+            self.scheduler.shutdown(wait=True, cancel_futures=True)
+            for path, error in self.fhs.sync_pending():  # the last batch of written files is on disk before the job is finished
+                self.report(ERROR, "sync", path, str(error))
+            if self.hash_cache is not None:
+                self.hash_cache.close()
+            if self.job is not None:
+                if completed:
+                    self.finish_job()
+                self.job.journal.close()
+
+        self.progress.finish()
+        return self.summarise()
+
+    # run a job for one file, errors are recorded as results so the other files carry on
+    def run_job(self, job, file_data):
+        try:
+            job(file_data)
+        except OSError as e:
+            self.report(ERROR, self.args.command, file_data["filename"], str(e))
+        finally:
+            self.progress.complete_file()
+
+    def generate(self, file_data):
+        self.report_result(self.fhs.generate_hash(file_data))
+
+    def verify(self, file_data):
+        self.report_result(self.fhs.verify_files(file_data, self.fhs.get_source_location))
+
+    # generate, copy and verify a file, the same steps as the Copy button
+    # the file is read once and written to every destination without it, a destination that can't be written is an error for that destination
+    def copy(self, file_data):
+        for result in self.fhs.copy_and_verify(file_data, self.args.destinations):
+            if result.process == "copy" and result.error is not None:
+                self.report(ERROR, "copy", file_data["filename"], result.message)
+                continue
+            if result.process == "copy" and result.passed:
+                result.message = f"{result.bytes_per_second / (1024 * 1024):.1f} MB/s to {result.location}"
+            self.report_result(result)
+
+    # mark the copy job finished once every file has been copied, a job with errors or failed verifies is kept so it can be resumed
+    def finish_job(self):
+        if all(status in (PASS, SKIP) for status, process, filename, message in self.results) and len(self.results) > 0:
+            self.job.finish()
+
+    # write the result counts to stderr and get the exit code
+    def summarise(self):
+        counts = {}
+        for status, process, filename, message in self.results:
+            counts.setdefault(process, {}).setdefault(status, 0)
+            counts[process][status] += 1
+        for process, process_counts in counts.items():
+            print(
+                f"{process}: " + ", ".join(f"{process_counts.get(status, 0)} {status}" for status in (PASS, SKIP, FAIL, ERROR)),
+                file=sys.stderr,
+            )
+
+        if self.args.timing:
+            self.print_timings()
+
+        statuses = {result[0] for result in self.results}
+        if ERROR in statuses:
+            return EXIT_ERROR
+        if FAIL in statuses:
+            return EXIT_FAILED
+        return EXIT_OK
+
+    # write the time spent in each phase and the slowest files to stderr
+    def print_timings(self):
+        timings = filehashingservice.summarise_timings(self.file_results)
+        elapsed_time = time.perf_counter() - self.progress.start_time
+        print(
+            f"{timings['bytes'] / (1024 * 1024):.1f} MB in {elapsed_time:.2f}s, "
+            f"{timings['bytes'] / (1024 * 1024) / elapsed_time if elapsed_time > 0 else 0:.1f} MB/s",
+            file=sys.stderr,
+        )
+        phase_total = sum(timings["phase_times"].values()) or 1
+        for phase, seconds in timings["phase_times"].items():
+            print(f"  {phase:<14}{seconds:>9.2f}s {seconds / phase_total:>5.0%}", file=sys.stderr)
+        print("slowest files:", file=sys.stderr)
+        for elapsed, process, filename, bytes_per_second in timings["slowest_files"]:
+            print(f"  {elapsed:>8.3f}s {bytes_per_second / (1024 * 1024):>8.1f} MB/s  {process:<9}{filename}", file=sys.stderr)
+
+
+# open the copy job journal shared with the GUI, copies run without it if it can't be opened
+def open_job_journal():
+    try:
+        return jobjournal.JobJournal()
+    except (OSError, sqlite3.Error) as e:
+        print(f"job journal unavailable, copies can't be resumed, {e}", file=sys.stderr)
+        return None
+
+
+# open the hash cache shared with the GUI, runs without it if it can't be opened
+def open_hash_cache():
+    try:
+        return hashcache.HashCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"hash cache unavailable, {e}", file=sys.stderr)
+        return None
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="acacli",
+        description="Generate, copy and verify file checksums without the aca GUI.",
+        epilog=f"exit codes: {EXIT_OK} all passed, {EXIT_FAILED} checksum mismatch, {EXIT_USAGE} usage error, "
+        f"{EXIT_ERROR} file error, {EXIT_INTERRUPTED} interrupted",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("source", help="directory of files to process")
+    common.add_argument("-r", "--recursive", action="store_true", help="include files in subdirectories")
+    common.add_argument(
+        "-a", "--algorithm", default="md5", choices=list(hashalgorithms.hash_algorithms), help="algorithm for new checksums (default md5)"
+    )
+    common.add_argument(
+        "--also", action="append", default=[], choices=list(hashalgorithms.hash_algorithms), help="also generate this algorithm from the same read, can be repeated"
+    )
+    common.add_argument("--manifest", action="store_true", help="write one checksum list per directory instead of a checksum file per file")
+    common.add_argument(
+        "--blocks", action="store_true", help="also write block checksums for large files, verify their blocks in parallel and recopy only corrupt blocks"
+    )
+    common.add_argument(
+        "--sample", type=int, default=0, metavar="BLOCKS", help="verify unchanged files with block checksums by reading this many random blocks (default 0, read in full)"
+    )
+    common.add_argument("--full-every", type=float, default=30, metavar="DAYS", help="days between full verifies of sampled files (default 30)")
+    common.add_argument("--full-budget", type=float, default=0, metavar="GB", help="GB of periodic full verifies in a run, 0 for no limit (default 0)")
+    common.add_argument("--quick", action="store_true", help="use cached checksums for files unchanged since they were last read")
+    common.add_argument("--no-cache", action="store_true", help="don't read or write the checksum cache")
+    common.add_argument("--chunk-size", type=int, default=1024, metavar="KB", help="read chunk size in KB (default 1024)")
+    common.add_argument("--copy-buffers", type=int, default=4, help="chunks read ahead while writing a copy, 1 to read and write in turn (default 4)")
+    common.add_argument(
+        "--cache",
+        default="normal",
+        choices=filehashingservice.cache_modes,
+        help="normal page cache use, drop files from the page cache as they're read, or direct reads without it (default normal)",
+    )
+    common.add_argument(
+        "--durability",
+        default="none",
+        choices=filehashingservice.durability_modes,
+        help="leave flushing written files to the system, fsync each file, or sync files in batches (default none)",
+    )
+    common.add_argument("--sync-files", type=int, default=64, metavar="N", help="files written between syncs in batch durability (default 64)")
+    common.add_argument("--sync-mb", type=int, default=256, metavar="MB", help="MB written between syncs in batch durability (default 256)")
+    common.add_argument("-j", "--workers", type=int, default=4, help="files processed at once (default 4)")
+    common.add_argument("--rotational-streams", type=int, default=1, help="files at once per hard disk drive (default 1)")
+    common.add_argument("--solid-state-streams", type=int, default=4, help="files at once per solid state drive (default 4)")
+    common.add_argument("--limit", type=float, default=0, metavar="MBPS", help="limit the MB/s read and written by every file together, 0 for no limit (default 0)")
+    common.add_argument("--nice", type=int, default=0, choices=range(0, 20), metavar="0-19", help="lower the CPU priority of the worker threads (Linux)")
+    common.add_argument(
+        "--io-priority", default="normal", choices=list(jobscheduler.io_priorities), help="disk priority of the worker threads (Linux, default normal)"
+    )
+    common.add_argument("--timing", action="store_true", help="show the time spent reading, hashing and writing, and the slowest files")
+    common.add_argument("-v", "--verbose", action="store_true", help="list every file result, not just failures and errors")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("generate", parents=[common], help="generate checksums for files without one")
+    copy_parser = commands.add_parser("copy", parents=[common], help="generate checksums, copy and verify files")
+    copy_parser.add_argument(
+        "destinations", nargs="+", metavar="destination", help="directory to copy files to, files are read once and copied to every destination given"
+    )
+    copy_parser.add_argument("--two-pass", action="store_true", help="generate checksums with a separate read before the copy")
+    copy_parser.add_argument("--no-verify", action="store_true", help="don't verify files at the destination after copy")
+    commands.add_parser("verify", parents=[common], help="verify files against their checksums")
+    resume_parser = commands.add_parser(
+        "resume", help="continue an interrupted copy, partly copied files continue from their last checkpoint"
+    )
+    resume_parser.add_argument("job", nargs="?", type=int, help="number of the copy job to resume (default the most recent unfinished job)")
+    resume_parser.add_argument("--list", action="store_true", help="list the unfinished copy jobs")
+    resume_parser.add_argument("-v", "--verbose", action="store_true", help="list every file result, not just failures and errors")
+
+    args = parser.parse_args(argv)
+    if args.command == "resume":
+        return args
+    if not os.path.isdir(args.source):
+        parser.error(f"source {args.source} is not a directory")
+    for destination in getattr(args, "destinations", []):
+        if not os.path.isdir(destination):
+            parser.error(f"destination {destination} is not a directory")
+    if args.command == "copy":
+        args.destinations = [os.path.abspath(destination) for destination in args.destinations]  # jobs are resumed from any directory
+    if args.chunk_size < 1 or args.workers < 1 or args.copy_buffers < 1:
+        parser.error("--chunk-size, --workers and --copy-buffers must be at least 1")
+    return args
+
+
+# resume an unfinished copy job with the arguments it was started with, or list the unfinished jobs, returns the exit code
+def resume_job(args):
+    job_journal = open_job_journal()
+    if job_journal is None:
+        return EXIT_ERROR
+    jobs = job_journal.get_unfinished_jobs()
+
+    if args.list:
+        for job in jobs:
+            print(f"{job.job_id}\t{job.source}\t{', '.join(job.destinations)}")
+        job_journal.close()
+        return EXIT_OK
+
+    if args.job is None:
+        job = next(iter(jobs), None)
+    else:
+        job = next((job for job in jobs if job.job_id == args.job), None)
+    if job is None:
+        print("no unfinished copy job to resume", file=sys.stderr)
+        job_journal.close()
+        return EXIT_USAGE
+
+    for location in [job.source] + job.destinations:
+        if not os.path.isdir(location):
+            print(f"{location} is not available, can't resume job {job.job_id}", file=sys.stderr)
+            job_journal.close()
+            return EXIT_USAGE
+
+    job_args = argparse.Namespace(**job.settings)
+    job_args.source = job.source
+    job_args.verbose = job_args.verbose or args.verbose
+    print(f"resuming job {job.job_id}, {job.source} to {', '.join(job.destinations)}", file=sys.stderr)
+    return BatchRunner(job_args, job).run()
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    if args.command == "resume":
+        return resume_job(args)
+    return BatchRunner(args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent import futures
+
+import filehashingservice
+import jobscheduler
+
+try:
+    import resource
+except ImportError:
+    resource = None  # peak RSS isn't reported on Windows
+
+# synthetic datasets, name: list of (number of files, file size in bytes), scaled by --scale
+datasets = {
+    "tiny": [(20000, 4 * 1024)],  # many tiny files, dominated by per file overhead
+    "mixed": [(2000, 16 * 1024), (500, 1024 * 1024), (50, 16 * 1024 * 1024), (4, 128 * 1024 * 1024)],
+    "huge": [(3, 1024 * 1024 * 1024)],  # a few huge files, dominated by read and hash throughput
+}
+
+operations = ("generate", "copy", "verify")
+
+
+# create a dataset's files in a directory from a seeded random generator, so every run benchmarks the same bytes
+def create_dataset(directory, file_specs, scale, seed):
+    generator = random.Random(seed)
+    block = generator.randbytes(1024 * 1024)  # files are built from one random block so creating them is quick
+    file_count = 0
+    for spec_index, (count, size) in enumerate(file_specs):
+        count = max(1, int(count * scale))
+        size = max(1, int(size * scale)) if size > 1024 * 1024 else size  # small files keep their size, only the number of them scales
+        for file_index in range(count):
+            with open(os.path.join(directory, f"{spec_index:02d}_{file_index:06d}.bin"), "wb") as f:
+                f.write(generator.randbytes(16))  # a unique header so no two files have the same checksum
+                remaining = size - 16
+                while remaining > 0:
+                    f.write(block[: min(remaining, len(block))])
+                    remaining -= len(block)
+            file_count += 1
+    return file_count
+
+
+# read the process I/O counters, Linux only, returns None elsewhere
+def read_io_counters():
+    try:
+        with open("/proc/self/io", "r") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f)}
+    except OSError:
+        return None
+
+
+# peak resident set size of the process in KB, None where it isn't available
+# the peak never goes down, so each run is measured in a process of its own by measure_operation
+def get_peak_rss():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss // 1024 if sys.platform == "darwin" else peak_rss  # macOS reports bytes, Linux KB
+
+
+# drop a directory's files from the page cache so the next run reads from the disk, Linux only
+def evict_page_cache(directory):
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for root, directories, filenames in os.walk(directory):
+        for filename in filenames:
+            fd = os.open(os.path.join(root, filename), os.O_RDONLY)
+            try:
+                os.fdatasync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+# run one operation on every file of a source directory and measure it, the time includes syncing the files written in the durability mode
+def run_operation(operation, source, destination, args, durability="none"):
+    fhs = filehashingservice.FileHashingService(
+        source, chunk_size=args.chunk_size * 1024, pipeline_depth=args.copy_buffers
+    )
+    fhs.checksum_algorithm = args.algorithm
+    fhs.cache_mode = args.cache
+    fhs.durability = durability
+    fhs.sync_batch.batch_files = args.sync_files
+    fhs.sync_batch.batch_bytes = args.sync_mb * 1024 * 1024
+    fhs.get_file_list()
+    scheduler = jobscheduler.DeviceScheduler(max_workers=args.workers)
+
+    if operation == "generate":
+        job = lambda file_data: fhs.generate_hash(file_data, regenerate=True)
+    elif operation == "copy":
+        job = lambda file_data: fhs.copy_file(file_data, destination, generate_hash=True)
+    else:
+        job = lambda file_data: fhs.verify_files(file_data, source)
+
+    if args.cold:
+        evict_page_cache(source)
+
+    io_before = read_io_counters()
+    start_time = time.perf_counter()
+    jobs = [
+        scheduler.submit(job, file_data, paths=[os.path.join(source, file_data["filename"]), destination])
+        for file_data in fhs.file_data_list
+    ]
+    results = [job_future.result() for job_future in jobs]
+    sync_errors = fhs.sync_pending()
+    seconds = time.perf_counter() - start_time
+    io_after = read_io_counters()
+    scheduler.shutdown(wait=True)
+
+    failed = [result.filename for result in results if result.status == filehashingservice.FAIL]
+    if failed:
+        raise RuntimeError(f"{operation} failed for {len(failed)} files, first {failed[0]}")
+    if sync_errors:
+        raise RuntimeError(f"{operation} couldn't sync {len(sync_errors)} files, first {sync_errors[0][0]}")
+
+    total_bytes = sum(file_data["size"] for file_data in fhs.file_data_list)
+    measurement = {
+        "files": len(results),
+        "bytes": total_bytes,
+        "seconds": seconds,
+        "mb_per_second": total_bytes / (1024 * 1024) / seconds if seconds > 0 else 0,
+        "files_per_second": len(results) / seconds if seconds > 0 else 0,
+        "peak_rss_kb": get_peak_rss(),
+    }
+    if io_before is not None and io_after is not None:
+        for counter in ("syscr", "syscw", "read_bytes", "write_bytes"):
+            measurement[counter] = io_after[counter] - io_before[counter]
+    return measurement
+
+
+# run an operation in a new process and measure it, so each run's peak memory is its own rather than the highest of every run before it
+# the process is spawned rather than forked so it doesn't start with the memory of the benchmark process
+def measure_operation(operation, source, destination, args, durability="none"):
+    with futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_operation, operation, source, destination, args, durability).result()
+
+
+# benchmark every operation on a dataset in each durability mode, each is repeated and the median run is kept
+# verify doesn't write files so it's only measured once
+def benchmark_dataset(name, work_directory, args):
+    source = os.path.join(work_directory, name)
+    os.makedirs(source)
+    file_count = create_dataset(source, datasets[name], args.scale, args.seed)
+    print(f"{name}: {file_count} files created", file=sys.stderr)
+
+    if "generate" not in args.operations:
+        run_operation("generate", source, source, args)  # copy and verify need checksum files
+
+    results = []
+    for operation in [operation for operation in operations if operation in args.operations]:
+        for durability in args.durability if operation != "verify" else ["none"]:
+            runs = []
+            for repeat in range(args.repeat):
+                destination = os.path.join(work_directory, f"{name}_copy")
+                shutil.rmtree(destination, ignore_errors=True)
+                os.makedirs(destination)
+                runs.append(measure_operation(operation, source, destination, args, durability))
+            measurement = sorted(runs, key=lambda run: run["seconds"])[len(runs) // 2]
+            measurement["seconds_spread"] = statistics.pstdev(run["seconds"] for run in runs)
+            results.append({"dataset": name, "operation": operation, "durability": durability, **measurement})
+            print(
+                f"{name} {operation} ({durability} durability): {measurement['mb_per_second']:.1f} MB/s, "
+                f"{measurement['files_per_second']:.1f} files/s",
+                file=sys.stderr,
+            )
+
+    shutil.rmtree(source, ignore_errors=True)
+    shutil.rmtree(os.path.join(work_directory, f"{name}_copy"), ignore_errors=True)
+    return results
+
+
+# compare results to a baseline, returns the (dataset, operation, durability, change) of throughput regressions beyond the tolerance
+# results of baselines from before durability modes were measured are taken as none durability
+def compare_to_baseline(results, baseline, tolerance):
+    baseline_results = {
+        (result["dataset"], result["operation"], result.get("durability", "none")): result for result in baseline["results"]
+    }
+    regressions = []
+    for result in results:
+        baseline_result = baseline_results.get((result["dataset"], result["operation"], result["durability"]))
+        if baseline_result is None or not baseline_result["mb_per_second"]:
+            continue
+        change = result["mb_per_second"] / baseline_result["mb_per_second"] - 1
+        print(
+            f"{result['dataset']} {result['operation']} ({result['durability']} durability): "
+            f"{baseline_result['mb_per_second']:.1f} > {result['mb_per_second']:.1f} MB/s ({change:+.1%})",
+            file=sys.stderr,
+        )
+        if change < -tolerance:
+            regressions.append((result["dataset"], result["operation"], result["durability"], change))
+    return regressions
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark generate, copy and verify throughput on synthetic datasets."
+    )
+    parser.add_argument("--datasets", nargs="+", default=list(datasets), choices=list(datasets))
+    parser.add_argument("--operations", nargs="+", default=list(operations), choices=operations)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the number of small files and the size of large files (default 1)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the dataset contents (default 0)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each operation, the median is reported (default 3)")
+    parser.add_argument("--workers", type=int, default=4, help="files processed at once (default 4)")
+    parser.add_argument("--chunk-size", type=int, default=1024, metavar="KB", help="read chunk size in KB (default 1024)")
+    parser.add_argument("--copy-buffers", type=int, default=4, help="chunks read ahead while writing a copy, 1 to read and write in turn (default 4)")
+    parser.add_argument("--algorithm", default="md5")
+    parser.add_argument("--cache", default="normal", choices=filehashingservice.cache_modes, help="page cache use of the reads (default normal)")
+    parser.add_argument(
+        "--durability",
+        nargs="+",
+        default=["none"],
+        choices=filehashingservice.durability_modes,
+        help="durability modes generate and copy are measured in (default none)",
+    )
+    parser.add_argument("--sync-files", type=int, default=64, metavar="N", help="files written between syncs in batch durability (default 64)")
+    parser.add_argument("--sync-mb", type=int, default=256, metavar="MB", help="MB written between syncs in batch durability (default 256)")
+    parser.add_argument("--cold", action="store_true", help="drop the source files from the page cache before each run (Linux)")
+    parser.add_argument("--directory", default=None, help="directory for the datasets, on the disk being benchmarked (default the system temp directory)")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="compare the results to a JSON file from a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="throughput drop from the baseline reported as a regression (default 0.1)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="aca_benchmark_", dir=args.directory) as work_directory:
+        for name in args.datasets:
+            results.extend(benchmark_dataset(name, work_directory, args))
+
+    report = {
+        "metadata": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "workers": args.workers,
+            "chunk_size": args.chunk_size * 1024,
+            "copy_buffers": args.copy_buffers,
+            "algorithm": args.algorithm,
+            "cold": args.cold,
+            "cache": args.cache,
+            "sync_files": args.sync_files,
+            "sync_mb": args.sync_mb,
+        },
+        "results": results,
+    }
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} throughput regressions beyond {args.tolerance:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+
+block_hashes_extension = "blocks"  # block checksums are kept in <filename>.blocks alongside the file's checksum file
+default_block_size = 64 * 1024 * 1024
+
+
+# This class is responsible for the block checksums of one file, the checksum of each block_size block of the file from its first byte
+# and the whole file checksum the blocks were generated with, so a stale block file is never used for a file that has been regenerated
+class BlockHashes:
+    def __init__(self, checksum_algorithm, block_size, checksum, block_checksums):
+        self.checksum_algorithm = checksum_algorithm
+        self.block_size = block_size
+        self.checksum = checksum  # whole file checksum
+        self.block_checksums = block_checksums  # hex digest of each block in order
+
+    # check the blocks cover a file of file_size bytes
+    def matches_size(self, file_size):
+        return len(self.block_checksums) == -(-file_size // self.block_size)
+
+    # get the (offset, length) of a block in a file of file_size bytes
+    def get_block_range(self, block_index, file_size):
+        offset = block_index * self.block_size
+        return offset, min(self.block_size, file_size - offset)
+
+
+# get the path of a file's block file
+def get_block_hashes_path(file_path):
+    return f"{file_path}.{block_hashes_extension}"
+
+
+# format the ranges of a file as "first-last" byte ranges for messages, adjacent ranges are joined
+def format_ranges(ranges):
+    joined_ranges = []
+    for offset, length in sorted(ranges):
+        if joined_ranges and joined_ranges[-1][1] == offset:
+            joined_ranges[-1][1] = offset + length
+        else:
+            joined_ranges.append([offset, offset + length])
+    return ", ".join(f"{start}-{end - 1}" for start, end in joined_ranges)
+
+
+# write a file's block file to a temporary file in the same directory that replaces the block file, readers never see a half written file
+def write_block_hashes(file_path, block_hashes):
+    block_hashes_path = get_block_hashes_path(file_path)
+    fd, temporary_path = tempfile.mkstemp(prefix=f".{os.path.basename(block_hashes_path)}.", dir=os.path.dirname(block_hashes_path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(f"algorithm {block_hashes.checksum_algorithm}\n")
+            f.write(f"block_size {block_hashes.block_size}\n")
+            f.write(f"checksum {block_hashes.checksum}\n")
+            for block_index, block_checksum in enumerate(block_hashes.block_checksums):
+                f.write(f"{block_checksum}  {block_index * block_hashes.block_size}\n")
+        # mkstemp files are only readable by their owner, the block file takes the permissions of the file it describes
+        shutil.copymode(block_hashes_path if os.path.exists(block_hashes_path) else file_path, temporary_path)
+        os.replace(temporary_path, block_hashes_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+# read a file's block file, returns None if there isn't one or it can't be read
+def read_block_hashes(file_path):
+    try:
+        with open(get_block_hashes_path(file_path), "r", encoding="utf-8", newline="\n") as f:
+            header = dict(f.readline().rstrip("\n").split(" ", 1) for header_line in range(3))
+            block_checksums = []
+            for line in f:
+                block_checksum, offset = line.split()
+                block_checksums.append(block_checksum.lower())
+        block_size = int(header["block_size"])
+        if block_size <= 0:
+            return None
+        return BlockHashes(header["algorithm"], block_size, header["checksum"].lower(), block_checksums)
+    except (OSError, ValueError, KeyError):
+        return None  # a missing or damaged block file is treated as no block file
+
@@ -1,139 +1,1791 @@
-import wx
 import os
-import hashlib
+import errno
 import shutil
-import glob
-from pubsub import pub
+import contextlib
+import hashlib
+import time
+import mmap
+import threading
+import queue
+import random
+import sys
+from concurrent import futures
+import hashalgorithms
+import jobjournal
+import manifest
+import blockhashes
+import ratelimiter
+
+if sys.platform.startswith("linux") or sys.platform == "darwin":
+    import fcntl
+
+if sys.platform.startswith("linux"):
+    import ctypes
+
+    try:
+        libc_syncfs = ctypes.CDLL(None, use_errno=True).syncfs  # os has no syncfs
+    except (OSError, AttributeError):
+        libc_syncfs = None
+else:
+    libc_syncfs = None
+
+FICLONE = 0x40049409  # Linux ioctl to reflink a file on copy on write filesystems (btrfs, xfs)
+F_NOCACHE = 48  # macOS fcntl to turn off caching of a file's reads and writes
+
+# how file reads use the page cache, drop removes files from the cache as they're read and direct reads them without the cache
+cache_modes = ("normal", "drop", "direct")
+direct_io_alignment = 4096  # O_DIRECT reads are whole pages read into page aligned buffers
+
+# when written files are flushed to their disks, none leaves it to the operating system, file syncs each file as it's written
+# and batch syncs the files written in groups
+durability_modes = ("none", "file", "batch")
+
+# copies are written to a partial copy file next to the destination file and renamed to it once complete,
+# so an interrupted copy never leaves a truncated file under the destination name
+partial_copy_extension = ".acapart"
+
+
+# hash a batch of files in a worker process, returns the (filename, {algorithm: hexdigest}, phase times, error) results in bulk
+# a file that can't be read has no checksums and the OSError as its error, the rest of the batch is still hashed
+# in drop and direct cache modes each file is dropped from the page cache before and after it's read, small files aren't worth aligned
+# direct reads so direct mode reads them as drop mode does, on macOS their caching is turned off
+# kept at module level so it can be sent to a ProcessPoolExecutor
+def hash_file_batch(source_location, filenames, checksum_algorithms, chunk_size=1024 * 1024, cache_mode="normal"):
+    results = []
+    for filename in filenames:
+        timer = PhaseTimer()
+        file_hash = hashalgorithms.MultiHash(checksum_algorithms, threaded=False)  # small files aren't worth a thread per algorithm
+        try:
+            with open(os.path.join(source_location, filename), "rb") as f:
+                if cache_mode != "normal":
+                    drop_file_cache(f)
+                for chunk in timer.timed_chunks(iter(lambda: f.read(chunk_size), b"")):
+                    hash_start = time.perf_counter()
+                    file_hash.update(chunk)
+                    timer.add("hash", hash_start)
+                if cache_mode != "normal":
+                    drop_file_cache(f)
+        except OSError as e:
+            results.append((filename, None, timer.phase_times, e))
+            continue
+        results.append((filename, file_hash.hexdigests(), timer.phase_times, None))
+    return results
+
+
+# drop a whole file from the page cache, or on macOS turn off its caching, advice only so errors are ignored
+def drop_file_cache(f):
+    with contextlib.suppress(OSError):
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        elif sys.platform == "darwin":
+            fcntl.fcntl(f.fileno(), F_NOCACHE, 1)
+
+
+# progress callback for services without a progress display
+def ignore_progress_update(**progress):
+    pass
+
+
+# phases of a file operation that are timed, kernel_copy is the read and write of a copy done by the kernel
+# throttle is time spent waiting for the rate limiter
+timing_phases = ("read", "hash", "write", "kernel_copy", "fsync", "checksum_file", "throttle")
+
+
+# This class is responsible for adding up the time spent in each phase of a file operation, using the high resolution performance counter
+class PhaseTimer:
+    def __init__(self):
+        self.phase_times = {}  # phase: seconds
+        self.lock = threading.Lock()  # pipeline stages add their phases from several threads
+
+    # add the time since start_time to a phase, returns the current time so consecutive phases can be timed from it
+    def add(self, phase, start_time):
+        current_time = time.perf_counter()
+        with self.lock:
+            self.phase_times[phase] = self.phase_times.get(phase, 0.0) + current_time - start_time
+        return current_time
+
+    @contextlib.contextmanager
+    def time(self, phase):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, start_time)
+
+    # time how long each chunk of a read takes to arrive as the read phase
+    # memory mapped chunks are only read from the disk when they're first used, so their read time is counted in the phase that uses them
+    def timed_chunks(self, chunks):
+        chunks = iter(chunks)
+        try:
+            while True:
+                read_start = time.perf_counter()
+                chunk = next(chunks, None)
+                self.add("read", read_start)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()  # releases the read_chunks buffer views if the operation stops early
+
+
+# file result statuses
+PASS = "pass"
+SKIP = "skip"
+FAIL = "fail"
+
+
+# This class is responsible for the outcome of a generate, copy or verify operation on one file
+class FileResult:
+    def __init__(
+        self,
+        filename,
+        process,
+        status,
+        digest=None,
+        algorithm=None,
+        bytes_processed=0,
+        elapsed=0.0,
+        from_cache=False,
+        message="",
+        phase_times=None,
+        location=None,
+        error=None,
+        corrupt_ranges=None,
+    ):
+        self.filename = filename
+        self.process = process  # "generate", "copy", "verify" or "repair"
+        self.status = status  # PASS, SKIP or FAIL
+        self.digest = digest  # generated or verified checksum, None if the file wasn't hashed
+        self.algorithm = algorithm
+        self.bytes_processed = bytes_processed  # bytes read from the disk, 0 for checksums taken from the hash cache
+        self.elapsed = elapsed  # seconds
+        self.from_cache = from_cache  # the checksum was taken from the hash cache instead of reading the file
+        self.message = message  # reason for a skip or failure
+        self.phase_times = phase_times or {}  # phase: seconds, from a PhaseTimer
+        self.location = location  # destination of a copy or location of a verify
+        self.error = error  # OSError that failed a copy to the destination
+        self.corrupt_ranges = corrupt_ranges or []  # (offset, length) of the blocks that failed a block verify
+
+    @property
+    def passed(self):
+        return self.status == PASS
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes_processed / self.elapsed if self.elapsed > 0 else 0
+
+    # format the elapsed time and phase breakdown for logs
+    def format_timing(self):
+        phases = ", ".join(
+            f"{phase} {self.phase_times[phase]:.3f}s" for phase in timing_phases if phase in self.phase_times
+        )
+        return f"{self.elapsed:.3f}s ({phases})" if phases else f"{self.elapsed:.3f}s"
+
+    def __repr__(self):
+        return f"FileResult({self.filename!r}, {self.process!r}, {self.status!r}, digest={self.digest!r})"
+
+
+# This class is responsible for the checkpoints of a copy recorded in a jobjournal.Job, so an interrupted copy can be resumed
+# a digest of the bytes copied so far is kept up to date and every interval bytes the destinations are flushed to their disks
+# and the offset and digest are recorded, a resumed copy checks the partial copy against the digest before continuing from the offset
+class CopyCheckpoints:
+    def __init__(self, job, filename, destination_locations, source_stat, timer, offset=0, prefix_hash=None, interval=256 * 1024 * 1024):
+        self.job = job
+        self.filename = filename
+        self.destination_locations = destination_locations
+        self.source_stat = source_stat  # a checkpoint is only resumed from if the source hasn't changed since
+        self.timer = timer
+        self.prefix_hash = prefix_hash or new_prefix_hash()  # digest of the bytes before the offset of the copy
+        self.interval = interval
+        self.next_offset = offset + interval
+
+    # add the chunk ending at offset to the digest, returns the digest if a checkpoint is due at the offset, otherwise None
+    def update(self, chunk, offset):
+        hash_start = time.perf_counter()
+        self.prefix_hash.update(chunk)
+        self.timer.add("hash", hash_start)
+        if offset < self.next_offset:
+            return None
+        self.next_offset = offset + self.interval
+        return self.prefix_hash.hexdigest()
+
+    # flush a destination's copy up to the offset to its disk and record the checkpoint
+    def save(self, index, dstf, offset, digest):
+        with self.timer.time("fsync"):
+            dstf.flush()
+            os.fsync(dstf.fileno())
+        self.job.checkpoint(self.filename, self.destination_locations[index], offset, digest, self.source_stat)
+
+
+# new hash object for the digest of the bytes copied before a checkpoint
+def new_prefix_hash():
+    return hashlib.blake2b(digest_size=32)
+
+
+# flush a file's data and metadata to its disk, Windows can only flush files opened for writing
+def sync_file(file_path):
+    fd = os.open(file_path, os.O_RDWR if os.name == "nt" else os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# flush a directory's entries to its disk so files created or renamed in it are still there after a crash, not possible on Windows
+def sync_directory(directory):
+    if os.name != "nt":
+        sync_file(directory)
+
+
+# flush every written file of the filesystem a path is on with one call, returns False where syncfs isn't available
+def sync_filesystem(path):
+    if libc_syncfs is None:
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if libc_syncfs(fd) != 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+    finally:
+        os.close(fd)
+    return True
+
+
+# This class is responsible for flushing written files to their disks in groups, once batch_files files or batch_bytes bytes are waiting
+# each filesystem in a batch is flushed with one syncfs on Linux, elsewhere each file and directory is fsynced one after another
+# updates that depend on a file being on the disk, such as its copy job state, wait until its batch is synced
+class SyncBatch:
+    def __init__(self, batch_files=64, batch_bytes=256 * 1024 * 1024):
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.lock = threading.Lock()  # held while a batch is synced so files aren't added to a batch being synced
+        self.paths = {}  # path: directory of the files written since the last sync
+        self.directories = {}  # directory: device of the directories of the files
+        self.file_count = 0
+        self.byte_count = 0
+        self.deferred_updates = []  # (path, update) waiting for a file's sync
+        self.errors = []  # (path, OSError) of files that couldn't be synced
+
+    # add a written file and its checksum files, syncs the batch if it's full
+    def add(self, paths, byte_count, directory):
+        with self.lock:
+            for path in paths:
+                self.paths[path] = directory
+            if directory not in self.directories:
+                self.directories[directory] = os.stat(directory).st_dev
+            self.file_count += 1
+            self.byte_count += byte_count
+            if self.file_count >= self.batch_files or self.byte_count >= self.batch_bytes:
+                self.sync()
+
+    # call update once a file has been synced, straight away if it isn't waiting for a sync
+    def defer(self, path, update):
+        with self.lock:
+            if path in self.paths:
+                self.deferred_updates.append((path, update))
+                return
+        update()
+
+    # sync the files waiting for a sync, returns and clears the (path, OSError) of every file that couldn't be synced
+    def sync_pending(self):
+        with self.lock:
+            if self.paths:
+                self.sync()
+            errors = self.errors
+            self.errors = []
+        return errors
+
+    # sync every file in the batch, called with the lock held, the deferred updates of files that couldn't be synced are dropped
+    def sync(self):
+        synced_devices = set()
+        for directory, device in self.directories.items():
+            if device in synced_devices:
+                continue
+            try:
+                if sync_filesystem(directory):
+                    synced_devices.add(device)
+            except OSError:
+                pass  # the filesystem's files are fsynced one at a time
+
+        failed_paths = set()
+        for path, directory in self.paths.items():
+            if self.directories[directory] not in synced_devices:
+                try:
+                    sync_file(path)
+                except OSError as e:
+                    failed_paths.add(path)
+                    self.errors.append((path, e))
+        for directory, device in self.directories.items():
+            if device not in synced_devices:
+                try:
+                    sync_directory(directory)
+                except OSError as e:
+                    failed_paths.update(path for path, path_directory in self.paths.items() if path_directory == directory)
+                    self.errors.append((directory, e))
+
+        deferred_updates = self.deferred_updates
+        self.paths = {}
+        self.directories = {}
+        self.file_count = 0
+        self.byte_count = 0
+        self.deferred_updates = []
+        for path, update in deferred_updates:
+            if path not in failed_paths:
+                update()
+
+
+# This class is responsible for coalescing the progress of a file operation into throttled progress updates
+class ProgressReporter:
+    def __init__(self, file_data, file_size, process, send_progress, interval=0.05):
+        self.file_data = file_data
+        self.file_size = file_size
+        self.process = process
+        self.send_progress = send_progress
+        self.interval = interval  # minimum seconds between progress updates
+        self.start_time = time.perf_counter()
+        self.last_update_time = 0
+        self.last_percent = None
+
+    # sends an update once per interval so large files keep their throughput current, and sooner whenever the percentage changes
+    # the final update is always sent
+    def update(self, byte_section):
+        current_time = time.perf_counter()
+        percent = int((byte_section / self.file_size) * 100) if self.file_size else 100
+        if (
+            byte_section < self.file_size
+            and current_time - self.last_update_time < self.interval
+            and percent == self.last_percent
+        ):
+            return
+
+        self.last_update_time = current_time
+        self.last_percent = percent
+        elapsed_time = current_time - self.start_time
+        self.send_progress(
+            file_data=self.file_data,
+            file_size=self.file_size,
+            byte_section=byte_section,
+            process=self.process,
+            bytes_per_second=byte_section / elapsed_time if elapsed_time > 0 else 0,
+        )
 
 
 # This class is responsible for generating file hashes
 class FileHashingService:
-    def __init__(self, get_source_location):
+    def __init__(
+        self,
+        get_source_location,
+        progress_interval=0.05,
+        chunk_size=1024 * 1024,
+        mmap_threshold=256 * 1024 * 1024,
+        use_kernel_copy=True,
+        hash_cache=None,
+        quick_verify=False,
+        recursive=False,
+        manifest_mode=False,
+        progress_callback=ignore_progress_update,
+        pipeline_depth=4,
+    ):
         self.file_data_list = []
+        self.file_listing = {}  # filename: (file identity, file data) from the last directory scan
         self.get_source_location = get_source_location
-        self.hash_verified = None
-        self.checksum_algorithm = "md5"
+        self.progress_callback = progress_callback  # called with file_data, file_size, byte_section, process and bytes_per_second keywords
+        self.progress_interval = progress_interval  # seconds between progress updates to the UI
+        self.chunk_size = chunk_size  # bytes read at a time by generate, copy and verify
+        self.mmap_threshold = mmap_threshold  # files of this size or larger are memory mapped, None to always use read buffers
+        self.cache_mode = "normal"  # cache_modes value, files are only memory mapped in normal mode
+        self.read_buffers = threading.local()  # reusable read buffer for each worker thread
+        self.pipeline_depth = pipeline_depth  # chunk_size buffers shared by the reader, hasher and writer of a copy, 1 copies without read ahead
+        self.use_kernel_copy = use_kernel_copy  # copy files without reading them into python when the checksum isn't generated
+        self.rate_limiter = ratelimiter.RateLimiter()  # limits the bytes read and written per second by every operation together, unlimited until set_rate
+        self.job = None  # optional jobjournal.Job that records the progress of copies so they can be resumed
+        self.checkpoint_interval = 256 * 1024 * 1024  # bytes copied between checkpoints of a job
+        self.single_pass_copy = True  # copy_and_verify generates a missing checksum from the copy read instead of a separate read
+        self.verify_after_copy = True  # copy_and_verify reads each destination back and verifies it
+        self.durability = "none"  # durability_modes value for copies and checksum files
+        self.sync_batch = SyncBatch()  # files waiting to be synced in batch durability mode
+        self.hash_cache = hash_cache  # optional hashcache.HashCache of previously hashed files
+        self.quick_verify = quick_verify  # use cached checksums for unchanged files instead of reading them again
+        self.recursive = recursive  # include files in subdirectories, filenames are then relative paths from the source location
+        self.manifest_mode = manifest_mode  # write checksums to one manifest per directory instead of a checksum file per file
+        self.manifests = manifest.ManifestStore()  # manifests are read from in either mode
+        self.checksum_algorithm = "md5"  # algorithm used for new checksums, existing checksum files of any algorithm are verified
+        self.additional_checksum_algorithms = []  # algorithms also generated from the same read, each written to its own checksum file
+        self.block_hashes = False  # also generate a block file of block_size block checksums for files larger than one block, and verify with it
+        self.block_size = blockhashes.default_block_size
+        self.block_verify_threads = 4  # blocks of a file verified at the same time
+        self.sample_blocks = 0  # blocks read by a sampled verify of an unchanged file with a block file, 0 to verify every file in full
+        self.full_verify_interval = 30 * 24 * 60 * 60  # seconds between full verifies of a sampled file
+        self.full_verify_budget = None  # bytes of periodic full verifies in a run, further files due one are sampled, None for no limit
+        self.full_verify_bytes = 0  # bytes of periodic full verifies started in this run
+        self.full_verify_lock = threading.Lock()
         self.empty_state = "\u002F" # empty checksum state "/"
 
-    # Get the list of files in the source directory
-    def get_file_list(self):
+    # Get the list of files in the source directory, on_files_found is called with each batch of files found as for rescan_file_list
+    def get_file_list(self, on_files_found=None):
+        self.file_listing.clear()
+        self.rescan_file_list(on_files_found)
+
+    # Rescan the source directory, only files or checksum files that changed since the last scan are read again
+    # on_files_found is called with the start index and file data of each new batch in file_data_list while the scan runs
+    # returns the number of files added, removed and changed
+    def rescan_file_list(self, on_files_found=None, batch_size=256, batch_interval=0.2):
+        self.manifests.clear()  # manifests are read again in case they were changed outside aca
+        previous_listing = self.file_listing
+        self.file_listing = {}
         self.file_data_list.clear()
-        complete_file_list = sorted(glob.glob(f"{self.get_source_location}/*.*"))
-        filtered_list = [f for f in complete_file_list if not f.startswith('.') and not f.lower().endswith('.ini') and not (os.name == 'nt' and f.startswith('$'))] # filter out common system and hidden files across os platforms
-        files_and_hashes = sorted(filtered_list, key=lambda x: os.path.basename(x).lower())
-
-        # Get the filename and hash string from the .md5 file if one already exists
-        for file_path in files_and_hashes:
-            file_base = os.path.basename(file_path)
-            file_mod_date = os.path.getmtime(file_path)
-            if os.path.isdir(file_path) or file_path.endswith(".md5"):
-                continue
-            elif os.path.exists(f"{file_path}.md5"):
-                with open(f"{file_path}.md5", "r") as f:
-                    file_hash = f.read(32)
+        added = changed = 0
+        batch_start = 0
+        batch_time = time.perf_counter()
+
+        for filename, entry, checksum_file_algorithm in self.iter_file_entries():
+            file_stat = entry.stat()
+            file_identity = (file_stat.st_size, file_stat.st_mtime_ns, checksum_file_algorithm)
+
+            if filename not in previous_listing:
+                added += 1
+                file_data = self.read_file_data(entry.path, filename, file_stat, checksum_file_algorithm)
+            elif previous_listing[filename][0] == file_identity:
+                file_data = previous_listing[filename][1]  # unchanged, reuse the file data from the last scan
             else:
-                file_hash = self.empty_state
+                changed += 1
+                file_data = self.read_file_data(entry.path, filename, file_stat, checksum_file_algorithm)
 
-            file_data = {"filename": file_base, "hash": file_hash, "mod_date": file_mod_date}
+            self.file_listing[filename] = (file_identity, file_data)
             self.file_data_list.append(file_data)
 
-    # Generate checksum hash and write to .md5 file
-    def generate_hash(self, file_data):
+            # send found files in batches so the first files can be shown and processed before the scan finishes
+            batch_length = len(self.file_data_list) - batch_start
+            if on_files_found is not None and (
+                batch_length >= batch_size or time.perf_counter() - batch_time >= batch_interval
+            ):
+                on_files_found(batch_start, self.file_data_list[batch_start:])
+                batch_start = len(self.file_data_list)
+                batch_time = time.perf_counter()
+
+        if on_files_found is not None and batch_start < len(self.file_data_list):
+            on_files_found(batch_start, self.file_data_list[batch_start:])
+
+        removed = len(set(previous_listing) - set(self.file_listing))
+        return added, removed, changed
+
+    # walk the source directory with os.scandir, which gives file types without a stat call for each file
+    # directories are scanned one at a time so files are found before the whole tree has been walked, subdirectories are only walked in recursive mode
+    # yields the path relative to the source location, the directory entry and the algorithm of the file's checksum file, None if it has none
+    def iter_file_entries(self):
+        directories = [""]
+        while directories:
+            relative_directory = directories.pop()
+            file_entries = []
+            checksum_names = {}  # filename: algorithms of its checksum files
+            manifest_algorithms = []  # algorithms of the directory's manifests
+            subdirectories = []
+            try:
+                with os.scandir(os.path.join(self.get_source_location, relative_directory)) as directory:
+                    for entry in directory:
+                        name, extension = os.path.splitext(entry.name)
+                        if extension[1:] in hashalgorithms.checksum_extensions:
+                            if name == manifest.manifest_name:
+                                manifest_algorithms.append(extension[1:])
+                            else:
+                                checksum_names.setdefault(name, set()).add(extension[1:])
+                        elif entry.is_dir():
+                            if self.recursive and self.is_listed_directory(entry.name):
+                                subdirectories.append(os.path.join(relative_directory, entry.name))
+                        elif self.is_listed_file(entry.name) and entry.is_file():
+                            file_entries.append(entry)
+            except OSError:
+                if relative_directory == "":
+                    raise
+                continue  # unreadable subdirectories are left out of the list
+
+            manifests = {
+                checksum_algorithm: self.manifests.get_manifest(
+                    os.path.join(self.get_source_location, relative_directory), checksum_algorithm
+                )
+                for checksum_algorithm in manifest_algorithms
+            }
+            for entry in sorted(file_entries, key=lambda x: x.name.lower()):
+                checksum_file_algorithms = checksum_names.get(entry.name, set()) | {
+                    checksum_algorithm
+                    for checksum_algorithm, directory_manifest in manifests.items()
+                    if directory_manifest.get(entry.name) is not None
+                }
+                yield (
+                    os.path.join(relative_directory, entry.name),
+                    entry,
+                    self.select_checksum_algorithm(checksum_file_algorithms),
+                )
+
+            directories.extend(sorted(subdirectories, key=str.lower, reverse=True))  # reversed so they're popped in name order
+
+    # filter out hidden and system directories across os platforms
+    def is_listed_directory(self, directory_name):
+        return not directory_name.startswith(".") and not (
+            os.name == "nt" and directory_name.startswith("$")
+        )
+
+    # filter out common system and hidden files across os platforms, and files without an extension
+    def is_listed_file(self, filename):
+        return (
+            "." in filename
+            and not filename.startswith(".")
+            and not filename.lower().endswith(".ini")
+            and not filename.endswith(partial_copy_extension)
+            and not filename.endswith(f".{blockhashes.block_hashes_extension}")
+            and not (os.name == "nt" and filename.startswith("$"))
+        )
+
+    # pick the checksum file to use from the algorithms of a file's checksum files, the selected algorithm is preferred
+    # returns None if the file has no checksum file of an installed algorithm
+    def select_checksum_algorithm(self, checksum_file_algorithms):
+        if self.checksum_algorithm in checksum_file_algorithms:
+            return self.checksum_algorithm
+        for checksum_algorithm in hashalgorithms.hash_algorithms:
+            if checksum_algorithm in checksum_file_algorithms:
+                return checksum_algorithm
+        return None
+
+    # find the checksum file or manifest entry for a file, returns its algorithm or None if there isn't one
+    def find_checksum_file(self, file_path):
+        return self.select_checksum_algorithm(
+            {
+                checksum_algorithm
+                for checksum_algorithm in hashalgorithms.hash_algorithms
+                if self.manifests.get(file_path, checksum_algorithm) is not None
+                or os.path.isfile(f"{file_path}.{checksum_algorithm}")
+            }
+        )
+
+    # read the checksum string from a file's checksum file, or its directory's manifest
+    # in manifest mode the manifest is used before a checksum file, otherwise a checksum file is used before the manifest
+    def read_checksum_file(self, file_path, checksum_algorithm):
+        manifest_checksum = self.manifests.get(file_path, checksum_algorithm)
+        if manifest_checksum is not None and self.manifest_mode:
+            return manifest_checksum
+        try:
+            with open(f"{file_path}.{checksum_algorithm}", "r") as f:
+                return hashalgorithms.parse_checksum(f.readline())
+        except FileNotFoundError:
+            return manifest_checksum
+
+    # Get the filename and hash string from the checksum file if one already exists
+    def read_file_data(self, file_path, filename, file_stat, checksum_file_algorithm):
+        if checksum_file_algorithm is not None:
+            file_hash = self.read_checksum_file(file_path, checksum_file_algorithm) or self.empty_state
+        else:
+            file_hash = self.empty_state
+
+        file_data = {
+            "filename": filename,
+            "hash": file_hash,
+            "algorithm": checksum_file_algorithm or self.checksum_algorithm,
+            "mod_date": file_stat.st_mtime,
+            "size": file_stat.st_size,
+        }
+
+        # show the checksum from a previous run for files without a checksum file
+        if file_hash == self.empty_state and self.hash_cache is not None:
+            # on Windows a scandir stat has no inode, so the cache stats the file itself to match the inode it stored
+            cached_hash = self.hash_cache.get(file_path, self.checksum_algorithm, file_stat if os.name != "nt" else None)
+            if cached_hash is not None:
+                file_data["cached_hash"] = cached_hash
+
+        return file_data
+
+    # get the algorithms generated for new checksums, the checksum_algorithm first
+    def get_checksum_algorithms(self):
+        checksum_algorithms = [self.checksum_algorithm]
+        for checksum_algorithm in self.additional_checksum_algorithms:
+            if checksum_algorithm not in checksum_algorithms:
+                checksum_algorithms.append(checksum_algorithm)
+        return checksum_algorithms
+
+    # create a multi hash of the checksum_algorithms read at the start of an operation, worker threads are only started for files larger than one chunk
+    # in block hashes mode files larger than one block are also hashed in blocks
+    def new_file_hash(self, file_size, checksum_algorithms):
+        return hashalgorithms.MultiHash(
+            checksum_algorithms,
+            threaded=file_size > self.chunk_size,
+            block_size=self.block_size if self.block_hashes and file_size > self.block_size else None,
+        )
+
+    # set the checksums generated for a file, file_hashes is {algorithm: hexdigest} of the checksum_algorithms the operation started with
+    # the first of them is the file's checksum, so changing the checksum_algorithm during a run only applies to the files started after it
+    def set_file_hashes(self, file_data, file_hashes, checksum_algorithms):
+        file_data["hashes"] = file_hashes
+        file_data["hash"] = file_hashes[checksum_algorithms[0]]
+        file_data["algorithm"] = checksum_algorithms[0]
+
+    # create a progress reporter for a file operation
+    def progress_reporter(self, file_data, file_size, process):
+        return ProgressReporter(
+            file_data, file_size, process, self.progress_callback, self.progress_interval
+        )
+
+    # get the calling thread's reusable read buffer, resized if the chunk_size has changed
+    def get_read_buffer(self):
+        read_buffer = getattr(self.read_buffers, "buffer", None)
+        if read_buffer is None or len(read_buffer) != self.chunk_size:
+            read_buffer = bytearray(self.chunk_size)
+            self.read_buffers.buffer = read_buffer
+        return read_buffer
+
+    # get the calling thread's reusable page aligned buffer for direct reads, chunk_size rounded up to whole pages
+    def get_direct_buffer(self):
+        direct_buffer = getattr(self.read_buffers, "direct", None)
+        if direct_buffer is None or len(direct_buffer) != self.get_direct_buffer_size():
+            direct_buffer = mmap.mmap(-1, self.get_direct_buffer_size())  # anonymous maps start on a page boundary
+            self.read_buffers.direct = direct_buffer
+        return direct_buffer
+
+    def get_direct_buffer_size(self):
+        return -(-self.chunk_size // direct_io_alignment) * direct_io_alignment
+
+    # get the calling thread's reusable copy pipeline buffers, resized if the chunk_size, pipeline_depth or cache_mode have changed
+    # in direct mode the buffers are page aligned so the source can be read without the page cache
+    def get_pipeline_buffers(self):
+        pipeline_buffers = getattr(self.read_buffers, "pipeline", None)
+        direct = self.cache_mode == "direct"
+        buffer_size = self.get_direct_buffer_size() if direct else self.chunk_size
+        if (
+            pipeline_buffers is None
+            or len(pipeline_buffers) != self.pipeline_depth
+            or len(pipeline_buffers[0]) != buffer_size
+            or isinstance(pipeline_buffers[0], mmap.mmap) != direct
+        ):
+            pipeline_buffers = [
+                mmap.mmap(-1, buffer_size) if direct else bytearray(buffer_size) for buffer_index in range(self.pipeline_depth)
+            ]
+            self.read_buffers.pipeline = pipeline_buffers
+        return pipeline_buffers
+
+    # open a file for reading without the page cache, with O_DIRECT on Linux and F_NOCACHE on macOS
+    # returns an unbuffered file, or None where the filesystem or platform doesn't support it (tmpfs, Windows)
+    # O_DIRECT reads must be whole pages at page aligned offsets into page aligned buffers
+    def open_direct(self, file_path):
+        if sys.platform.startswith("linux") and hasattr(os, "O_DIRECT"):
+            try:
+                fd = os.open(file_path, os.O_RDONLY | os.O_DIRECT)
+            except OSError as e:
+                if e.errno != errno.EINVAL:
+                    raise
+                return None
+            return open(fd, "rb", buffering=0)
+        if sys.platform == "darwin":
+            f = open(file_path, "rb", buffering=0)
+            fcntl.fcntl(f.fileno(), F_NOCACHE, 1)
+            return f
+        return None
+
+    # open a source file to read from the offset, without the page cache in direct mode if the offset is page aligned
+    # otherwise the file's cached pages are dropped first in drop and direct modes so the read comes from the disk
+    # returns the file and whether it was opened for direct reads, which need aligned buffers
+    def open_source(self, file_path, offset=0):
+        if self.cache_mode == "direct" and offset % direct_io_alignment == 0:
+            f = self.open_direct(file_path)
+            if f is not None:
+                f.seek(offset)
+                return f, True
+        f = open(file_path, "rb")
+        f.seek(offset)
+        if self.cache_mode != "normal" and hasattr(os, "posix_fadvise"):
+            with contextlib.suppress(OSError):
+                os.posix_fadvise(f.fileno(), offset, 0, os.POSIX_FADV_SEQUENTIAL)  # read ahead further
+            self.drop_cached(f.fileno(), offset, 0)
+        return f, False
+
+    # drop a range of a file from the page cache in drop and direct modes, a length of 0 is to the end of the file
+    # dirty pages aren't dropped but are written back, so they can be dropped by a later call
+    def drop_cached(self, fd, offset, length):
+        if self.cache_mode == "normal" or not hasattr(os, "posix_fadvise"):
+            return
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass  # advice only, not every file supports it
+
+    # read a file in chunk_size chunks from the offset to the end of the file, or length bytes from the offset if a length is given
+    # large files are memory mapped and smaller files are read into a reusable buffer
+    # each chunk is a memoryview that is only valid until the next chunk is read
+    # in drop and direct modes files are read into the buffer and dropped from the page cache as they're read, or read without it
+    def read_chunks(self, file_path, offset=0, length=None):
+        f, direct = self.open_source(file_path, offset)
+        if direct:
+            yield from self.read_direct_chunks(f, offset, length)
+            return
+        with f:
+            file_size = os.fstat(f.fileno()).st_size
+            if self.cache_mode == "normal" and self.mmap_threshold is not None and file_size >= max(self.mmap_threshold, 1):
+                end = file_size if length is None else min(file_size, offset + length)
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                    with memoryview(mapped_file) as mapped_view:
+                        for chunk_offset in range(offset, end, self.chunk_size):
+                            chunk = mapped_view[chunk_offset : min(chunk_offset + self.chunk_size, end)]
+                            try:
+                                yield chunk
+                            finally:
+                                chunk.release()  # the mmap can't be closed while views of it exist
+            else:
+                read_buffer = self.get_read_buffer()
+                remaining = length
+                with memoryview(read_buffer) as buffer_view:
+                    while remaining is None or remaining > 0:
+                        with buffer_view[: self.chunk_size if remaining is None else min(self.chunk_size, remaining)] as read_view:
+                            bytes_read = f.readinto(read_view)
+                        if not bytes_read:
+                            break
+                        if remaining is not None:
+                            remaining -= bytes_read
+                        chunk = buffer_view[:bytes_read]
+                        try:
+                            yield chunk
+                        finally:
+                            chunk.release()
+                        self.drop_cached(f.fileno(), offset, bytes_read)
+                        offset += bytes_read
+
+    # read a file opened by open_direct in whole pages into the thread's aligned buffer, from the page before the offset
+    # the chunks are cut to the bytes from the offset to the end of the file or length, and are only valid until the next is read
+    def read_direct_chunks(self, f, offset, length):
+        with f:
+            file_size = os.fstat(f.fileno()).st_size
+            end = file_size if length is None else min(file_size, offset + length)
+            position = offset - offset % direct_io_alignment
+            f.seek(position)
+            with memoryview(self.get_direct_buffer()) as buffer_view:
+                while position < end:
+                    bytes_read = f.readinto(buffer_view)
+                    if not bytes_read:
+                        break
+                    chunk = buffer_view[max(offset - position, 0) : min(bytes_read, end - position)]
+                    position += bytes_read
+                    try:
+                        yield chunk
+                    finally:
+                        chunk.release()
+
+    # read_chunks timed as the read phase, each chunk is counted by the rate limiter before the next is read
+    def timed_read_chunks(self, file_path, timer, offset=0, length=None):
+        chunks = timer.timed_chunks(self.read_chunks(file_path, offset, length))
+        try:
+            for chunk in chunks:
+                yield chunk
+                self.throttle(len(chunk), timer)
+        finally:
+            chunks.close()
+
+    # count bytes read or written with the rate limiter, waiting if they are ahead of the rate, the wait is timed as the throttle phase
+    # a copy counts its read of the source and its write to each destination, so copying to several destinations is limited too
+    def throttle(self, byte_count, timer):
+        throttle_start = time.perf_counter()
+        if self.rate_limiter.acquire(byte_count):
+            timer.add("throttle", throttle_start)
+
+    # Generate checksum hashes from one read of the file and write each to its checksum file, returns a FileResult
+    # files that already have a checksum are skipped unless regenerate is set
+    def generate_hash(self, file_data, regenerate=False):
+        if file_data["hash"] != self.empty_state and not regenerate:
+            return FileResult(
+                file_data["filename"], "generate", SKIP, file_data["hash"], file_data["algorithm"], message="has checksum"
+            )
+
+        start_time = time.perf_counter()
+        timer = PhaseTimer()
         file_path = os.path.join(self.get_source_location, file_data["filename"])
         file_size = os.path.getsize(
             file_path
-        )  # get the file size for updating the update_progress_bar method
-
-        file_hash = hashlib.md5()
-        with open(file_path, "rb") as f:
-            while chunk := f.read(8192):
-                byte_section = (
-                    f.tell()
-                )  # returns the current position of the file read pointer to update the update_progress_bar method
+        )  # get the file size for updating the progress display
+
+        progress = self.progress_reporter(file_data, file_size, "generate")
+
+        # in quick mode the checksums of an unchanged file are taken from the hash cache without reading the file
+        checksum_algorithms = self.get_checksum_algorithms()
+        cached_hashes = {
+            checksum_algorithm: self.get_cached_hash(file_path, checksum_algorithm)
+            for checksum_algorithm in checksum_algorithms
+        }
+        if None not in cached_hashes.values():
+            self.set_file_hashes(file_data, cached_hashes, checksum_algorithms)
+            progress.update(file_size)
+            with timer.time("checksum_file"):
+                self.write_checksum_file(file_path, file_data)
+            self.make_durable(self.get_checksum_paths(file_path, file_data), 0, timer)
+            return self.file_result(file_data, "generate", start_time, timer, from_cache=True)
+
+        byte_section = 0
+        with self.new_file_hash(file_size, checksum_algorithms) as file_hash:
+            for chunk in self.timed_read_chunks(file_path, timer):
+                byte_section += len(chunk)
+                hash_start = time.perf_counter()
                 file_hash.update(chunk)
-                progress_bar_refactor = 0  # adjust update_progress_bar start point according to order of process (generate (0) > copy (33.3) > verify (66.6))
-
-                wx.CallAfter(
-                    pub.sendMessage,
-                    "progress_update",
-                    file_data=file_data,
-                    file_size=file_size,
-                    byte_section=byte_section,
-                    progress_bar_refactor=progress_bar_refactor,
-                )  # send to pub.subscribe to update update_progres_bar method
-
-            file_data["hash"] = file_hash.hexdigest()
-
-        with open(f"{file_path}.{self.checksum_algorithm}", "w") as f:
-            f.write(f"{file_data['hash']}  *{file_data['filename']}")
-
-    # copy file from source > destination
-    def copy_file(self, file_data, get_destination_location):
-        chunk_size = (
-            1024 * 1024
-        )  # data chunk size (1MB) to track copy progress and update update_progress_bar method
+                timer.add("hash", hash_start)
+
+                progress.update(byte_section)  # send to the progress_callback to update the progress display
+
+        self.set_file_hashes(file_data, file_hash.hexdigests(), checksum_algorithms)
+        self.cache_hashes(file_path, file_data)
+
+        with timer.time("checksum_file"):
+            self.write_checksum_file(file_path, file_data)
+            self.write_block_file(file_path, file_data, file_hash.block_hexdigests())
+        self.make_durable(self.get_checksum_paths(file_path, file_data), 0, timer)
+        return self.file_result(file_data, "generate", start_time, timer, byte_section)
+
+    # create a PASS result for the checksum now in a file's file data
+    def file_result(self, file_data, process, start_time, timer, bytes_processed=0, from_cache=False, location=None):
+        return FileResult(
+            file_data["filename"],
+            process,
+            PASS,
+            file_data["hash"],
+            file_data["algorithm"],
+            bytes_processed,
+            time.perf_counter() - start_time,
+            from_cache,
+            phase_times=timer.phase_times,
+            location=location,
+        )
+
+    # Generate checksum hashes for a batch of small files in a worker process and write their checksum files, returns a FileResult for each file
+    # files that can't be read or whose checksum files can't be written fail without stopping the rest of the batch
+    def generate_hash_batch(self, file_data_batch, process_pool_executor):
+        start_time = time.perf_counter()
+
+        # in quick mode the checksums of unchanged files are taken from the hash cache, only the other files are sent to the worker process
+        checksum_algorithms = self.get_checksum_algorithms()
+        cached_hashes = {}  # filename: {algorithm: hexdigest} of the files with every checksum cached
+        for file_data in file_data_batch:
+            file_hashes = {
+                checksum_algorithm: self.get_cached_hash(os.path.join(self.get_source_location, file_data["filename"]), checksum_algorithm)
+                for checksum_algorithm in checksum_algorithms
+            }
+            if None not in file_hashes.values():
+                cached_hashes[file_data["filename"]] = file_hashes
+
+        filenames = [file_data["filename"] for file_data in file_data_batch if file_data["filename"] not in cached_hashes]
+        hashed_files = {}  # filename: ({algorithm: hexdigest}, phase times, error) from the worker process
+        if filenames:
+            results = process_pool_executor.submit(
+                hash_file_batch,
+                self.get_source_location,
+                filenames,
+                checksum_algorithms,
+                self.chunk_size,
+                self.cache_mode,
+            ).result()  # one round trip to the worker process for the whole batch
+            hashed_files = {filename: (file_hashes, phase_times, error) for filename, file_hashes, phase_times, error in results}
+
+        file_results = []
+        for file_data in file_data_batch:
+            filename = file_data["filename"]
+            timer = PhaseTimer()
+            from_cache = filename in cached_hashes
+            if from_cache:
+                file_hashes, error = cached_hashes[filename], None
+            else:
+                file_hashes, phase_times, error = hashed_files[filename]
+                timer.phase_times.update(phase_times)  # read and hash times from the worker process
+                self.throttle(file_data["size"], timer)  # the worker process reads without the rate limiter, the batch is counted once it's read
+            try:
+                if error is not None:
+                    raise error
+                self.set_file_hashes(file_data, file_hashes, checksum_algorithms)
+                if not from_cache:
+                    self.cache_hashes(os.path.join(self.get_source_location, filename), file_data)
+                with timer.time("checksum_file"):
+                    self.write_checksum_file(os.path.join(self.get_source_location, filename), file_data)
+                self.make_durable(self.get_checksum_paths(os.path.join(self.get_source_location, filename), file_data), 0, timer)
+            except OSError as e:
+                # one unreadable file or unwritable checksum file fails that file, the rest of the batch keeps its checksums
+                file_results.append(
+                    FileResult(
+                        filename,
+                        "generate",
+                        FAIL,
+                        elapsed=time.perf_counter() - start_time,
+                        message=f"generate failed, {e}",
+                        phase_times=timer.phase_times,
+                        error=e,
+                    )
+                )
+                continue
+            file_results.append(
+                self.file_result(file_data, "generate", start_time, timer, 0 if from_cache else file_data["size"], from_cache)
+            )
+
+        return file_results
+
+    # get the cached checksum for an unchanged file when quick_verify is on, otherwise None
+    def get_cached_hash(self, file_path, checksum_algorithm=None):
+        if not self.quick_verify or self.hash_cache is None:
+            return None
+        return self.hash_cache.get(file_path, checksum_algorithm or self.checksum_algorithm)
+
+    # store a file checksum in the hash cache
+    def cache_hash(self, file_path, file_hash, checksum_algorithm=None):
+        if self.hash_cache is not None:
+            self.hash_cache.put(file_path, checksum_algorithm or self.checksum_algorithm, file_hash)
+
+    # store every generated checksum of a file in the hash cache
+    def cache_hashes(self, file_path, file_data):
+        for checksum_algorithm, file_hash in file_data["hashes"].items():
+            self.cache_hash(file_path, file_hash, checksum_algorithm)
+
+    # get the checksums of a file, {algorithm: hexdigest}
+    def get_file_hashes(self, file_data):
+        return file_data.get("hashes", {file_data["algorithm"]: file_data["hash"]})
+
+    # write each checksum hash and the filename to a checksum file alongside the source file, named with the algorithm as the extension
+    # in manifest mode the checksums are added to the directory's manifest instead
+    def write_checksum_file(self, file_path, file_data):
+        for checksum_algorithm, file_hash in self.get_file_hashes(file_data).items():
+            if self.manifest_mode:
+                self.manifests.set(file_path, checksum_algorithm, file_hash)
+                continue
+            with open(f"{file_path}.{checksum_algorithm}", "w") as f:
+                f.write(f"{file_hash}  *{os.path.basename(file_data['filename'])}")
+
+    # get the checksum files, or in manifest mode the manifests, a file's checksums are written to and its block file if it has one
+    def get_checksum_paths(self, file_path, file_data):
+        checksum_paths = [
+            self.manifests.get_manifest_path(os.path.dirname(file_path), checksum_algorithm)
+            if self.manifest_mode
+            else f"{file_path}.{checksum_algorithm}"
+            for checksum_algorithm in self.get_file_hashes(file_data)
+        ]
+        if os.path.isfile(blockhashes.get_block_hashes_path(file_path)):
+            checksum_paths.append(blockhashes.get_block_hashes_path(file_path))
+        return checksum_paths
+
+    # make a written file and its checksum files durable, paths are in the same directory with the written file first
+    # file durability fsyncs each of them and the directory their names are in now, batch durability adds them to the sync batch
+    # errors syncing are raised
+    def make_durable(self, paths, byte_count, timer):
+        if self.durability == "none" or not paths:
+            return
+        with timer.time("fsync"):
+            if self.durability == "file":
+                for path in paths:
+                    sync_file(path)
+                sync_directory(os.path.dirname(paths[0]))
+            else:
+                self.sync_batch.add(paths, byte_count, os.path.dirname(paths[0]))
+
+    # sync the files still waiting in the sync batch, called once every file of a run is written
+    # returns the (path, OSError) of each file that couldn't be synced since the last call
+    def sync_pending(self):
+        return self.sync_batch.sync_pending()
+
+    # record a complete copy in the job once it's durable, in batch durability that's when its batch is synced
+    def set_job_copied(self, filename, location):
+        job = self.job
+        if job is not None:
+            self.sync_batch.defer(os.path.join(location, filename), lambda: job.set_copied(filename, location))
+
+    # record a verified copy in the job once it's durable, a copy waiting in the sync batch is recorded when its batch is synced
+    def set_job_verified(self, filename, location):
+        job = self.job
+        if job is not None:
+            self.sync_batch.defer(os.path.join(location, filename), lambda: job.set_verified(filename, location))
+
+    # write the block checksums generated with a file's checksum to its block file, block_checksums is None for files not hashed in blocks
+    def write_block_file(self, file_path, file_data, block_checksums):
+        if block_checksums is None:
+            return
+        blockhashes.write_block_hashes(
+            file_path, blockhashes.BlockHashes(file_data["algorithm"], self.block_size, file_data["hash"], block_checksums)
+        )
+
+    # copy file from source > destination, if generate_hash is set the checksum is generated from the same read as the copy
+    # returns a FileResult, with the generated checksum if generate_hash is set, errors writing the destination are raised
+    def copy_file(self, file_data, get_destination_location, generate_hash=False):
+        result = self.copy_file_to_destinations(file_data, [get_destination_location], generate_hash)[0]
+        if result.error is not None:
+            raise result.error
+        return result
+
+    # Copy a file to every destination without it and verify each destination, the copy operation of the apps, yields FileResults as they happen:
+    # the generate result, a copy result for each destination in order, then for each destination with the file a repair result if corrupt
+    # blocks were copied again and its verify result
+    # destinations the job already copied and verified are skipped, destinations that already have the file are verified without a copy
+    # in single pass mode a file without a checksum has it generated from the copy read, otherwise it's generated by a separate read first
+    # each destination is recorded as verified in the job once its verify passes or is skipped, errors reading the source are raised
+    def copy_and_verify(self, file_data, destination_locations):
+        filename = file_data["filename"]
+        completed_locations = [
+            location
+            for location in destination_locations
+            if self.job is not None and self.job.get_state(filename, location) == jobjournal.VERIFIED
+        ]
+        available_locations = [location for location in destination_locations if os.path.exists(location)]
+        copy_locations = [
+            location
+            for location in available_locations
+            if location not in completed_locations and not os.path.isfile(os.path.join(location, filename))
+        ]
+
+        single_pass = self.single_pass_copy and file_data["hash"] == self.empty_state and len(copy_locations) > 0
+        if not single_pass:
+            yield self.generate_hash(file_data)
+
+        copy_results = {}  # location: its copy result
+        for location in destination_locations:
+            if location in completed_locations:
+                copy_results[location] = FileResult(
+                    filename, "copy", SKIP, message=f"completed in {location} by copy job {self.job.job_id}", location=location
+                )
+            elif location not in available_locations:
+                error = FileNotFoundError(errno.ENOENT, "destination not available", location)
+                copy_results[location] = FileResult(
+                    filename, "copy", FAIL, message=f"copy to {location} failed, {error}", location=location, error=error
+                )
+            elif location not in copy_locations:
+                copy_results[location] = FileResult(filename, "copy", SKIP, message=f"exists in {location}", location=location)
+
+        if copy_locations:
+            for result in self.copy_file_to_destinations(file_data, copy_locations, generate_hash=single_pass):
+                copy_results[result.location] = result
+            if single_pass and file_data["hash"] != self.empty_state:
+                yield FileResult(filename, "generate", PASS, file_data["hash"], file_data["algorithm"], message="generated during copy")
+        for location in destination_locations:
+            yield copy_results[location]
+
+        for location in destination_locations:
+            if location in completed_locations:
+                yield FileResult(filename, "verify", SKIP, message=f"verified in {location} by copy job {self.job.job_id}", location=location)
+            elif copy_results[location].status == FAIL:
+                continue
+            elif not self.verify_after_copy:
+                yield FileResult(filename, "verify", SKIP, message=f"verify after copy disabled in {location}", location=location)
+                self.set_job_verified(filename, location)
+            else:
+                result = self.verify_files(file_data, location)
+                if result.corrupt_ranges:
+                    repair_result = self.repair_blocks(file_data, location, result.corrupt_ranges)
+                    yield repair_result
+                    if repair_result.passed:
+                        result = self.verify_files(file_data, location)
+                yield result
+                if result.status != FAIL:
+                    self.set_job_verified(filename, location)
+
+    # copy file from source > every destination from a single read of the source, each chunk is written to the destinations in parallel
+    # each copy is written to a partial copy file that replaces the destination file once complete, with a job set an interrupted
+    # copy is continued from its last checkpoint
+    # returns a FileResult for each destination in order, a destination that can't be written fails without stopping the others
+    # errors reading the source are raised
+    def copy_file_to_destinations(self, file_data, destination_locations, generate_hash=False):
+        start_time = time.perf_counter()
+        timer = PhaseTimer()
         source_file = os.path.join(self.get_source_location, file_data["filename"])
-        destination_file = os.path.join(get_destination_location, file_data["filename"])
-        total_size = os.path.getsize(source_file)
+        destination_files = [os.path.join(location, file_data["filename"]) for location in destination_locations]
+        partial_files = [destination_file + partial_copy_extension for destination_file in destination_files]
+        source_stat = os.stat(source_file)
+        total_size = source_stat.st_size
+        progress = self.progress_reporter(file_data, total_size, "copy")
+        write_errors = {}  # index of a destination: the OSError that stopped its copy
+
+        bytes_copied, prefix_hash = self.get_resume_offset(file_data["filename"], destination_locations, partial_files, source_stat, timer)
+        resume_offset = bytes_copied
+        checksum_algorithms = self.get_checksum_algorithms()
+        file_hash = self.new_file_hash(total_size, checksum_algorithms) if generate_hash else None
+        checkpoints = None
+        if self.job is not None:
+            checkpoints = CopyCheckpoints(
+                self.job,
+                file_data["filename"],
+                destination_locations,
+                source_stat,
+                timer,
+                bytes_copied,
+                prefix_hash,
+                self.checkpoint_interval,
+            )
+
+        dstfs = {}  # index of a destination: its open partial copy file
+        for index, partial_file in enumerate(partial_files):
+            try:
+                os.makedirs(
+                    os.path.dirname(partial_file), exist_ok=True
+                )  # recreate the subdirectories of files from a recursive source
+                dstfs[index] = open(partial_file, "r+b" if bytes_copied else "wb")
+            except OSError as e:
+                write_errors[index] = e
+
+        try:
+            with file_hash or contextlib.nullcontext():
+                if bytes_copied and file_hash is not None:
+                    self.hash_partial_copy(partial_files[0], bytes_copied, [file_hash], timer)  # the checksum covers the bytes copied before
+
+                # files large enough to be checkpointed are copied in python so the checkpoint digest can be kept
+                if (
+                    len(dstfs) == 1
+                    and file_hash is None
+                    and (checkpoints is None or total_size <= self.checkpoint_interval)
+                    and self.use_kernel_copy
+                    and not bytes_copied
+                ):
+                    index, dstf = next(iter(dstfs.items()))
+                    try:
+                        bytes_copied = self.kernel_copy(source_file, dstf, total_size, progress, timer)
+                    except OSError as e:
+                        write_errors[index] = e
+
+                # buffered copy through the reusable read buffers, continues from wherever the kernel copy or a resumed copy stopped
+                # files of more than one chunk, and every copy to several destinations, go through the pipeline so the source is read while
+                # the destinations are written
+                open_dstfs = {index: dstf for index, dstf in dstfs.items() if index not in write_errors}
+                if bytes_copied < total_size and (
+                    len(open_dstfs) > 1 or (open_dstfs and self.pipeline_depth > 1 and total_size - bytes_copied > self.chunk_size)
+                ):
+                    for dstf in open_dstfs.values():
+                        dstf.seek(bytes_copied)
+                    bytes_copied, pipeline_errors = self.pipelined_copy(
+                        source_file, open_dstfs, bytes_copied, file_hash, progress, timer, checkpoints
+                    )
+                    write_errors.update(pipeline_errors)
+
+                elif bytes_copied < total_size and open_dstfs:
+                    index, dstf = next(iter(open_dstfs.items()))
+                    dstf.seek(bytes_copied)
+                    for buffer in self.timed_read_chunks(source_file, timer, bytes_copied):
+                        phase_start = time.perf_counter()
+                        try:
+                            dstf.write(buffer)
+                            self.drop_cached(dstf.fileno(), bytes_copied, len(buffer))
+                        except OSError as e:
+                            write_errors[index] = e
+                            break
+                        timer.add("write", phase_start)
+                        self.throttle(len(buffer), timer)
+                        phase_start = time.perf_counter()
+                        if file_hash is not None:
+                            file_hash.update(buffer)
+                            timer.add("hash", phase_start)
+                        bytes_copied += len(buffer)
+                        if checkpoints is not None and (digest := checkpoints.update(buffer, bytes_copied)) is not None:
+                            try:
+                                checkpoints.save(index, dstf, bytes_copied, digest)
+                            except OSError as e:
+                                write_errors[index] = e
+                                break
+                        progress.update(bytes_copied)
+
+                # in file durability each complete copy is on its disk before it replaces the destination file
+                if self.durability == "file" and bytes_copied == total_size:
+                    for index, dstf in dstfs.items():
+                        if index in write_errors:
+                            continue
+                        try:
+                            with timer.time("fsync"):
+                                if resume_offset:
+                                    dstf.truncate(bytes_copied)
+                                dstf.flush()
+                                os.fsync(dstf.fileno())
+                        except OSError as e:
+                            write_errors[index] = e
+
+                if file_hash is not None and len(write_errors) < len(destination_files):
+                    file_hashes = file_hash.hexdigests()
+                    block_checksums = file_hash.block_hexdigests()
+        finally:
+            write_start = time.perf_counter()
+            for index, dstf in dstfs.items():
+                try:
+                    with dstf:  # closing a destination flushes its last buffered write
+                        if resume_offset:
+                            dstf.truncate(bytes_copied)  # the partial copy may have been written past its checkpoint before it was interrupted
+                        if self.cache_mode != "normal":
+                            dstf.flush()
+                            self.drop_cached(dstf.fileno(), 0, 0)  # pages written back since they were written are dropped now
+                except OSError as e:
+                    write_errors.setdefault(index, e)
+            timer.add("write", write_start)
+
+        # complete copies replace their destination file, failed copies are kept for a job to resume and removed otherwise
+        for index, partial_file in enumerate(partial_files):
+            try:
+                if index not in write_errors:
+                    os.replace(partial_file, destination_files[index])
+                elif self.job is None and index in dstfs:
+                    os.remove(partial_file)
+            except OSError as e:
+                write_errors.setdefault(index, e)
+
+        copied_indexes = [index for index in range(len(destination_files)) if index not in write_errors]
+        checksum_file_start = time.perf_counter()
+        if file_hash is not None and copied_indexes:
+            self.set_file_hashes(file_data, file_hashes, checksum_algorithms)
+            self.cache_hashes(source_file, file_data)
+            self.write_checksum_file(source_file, file_data)
+            self.write_block_file(source_file, file_data, block_checksums)
+
+        # copy the checksum files to destination once file copy complete, in manifest mode the checksums are added to the destination manifest
+        # the block file is copied in either mode
+        durable_paths = {}  # index of a destination: its destination file and the checksum files written alongside it
+        for index in copied_indexes:
+            durable_paths[index] = [destination_files[index]]
+            try:
+                if self.manifest_mode:
+                    # every checksum the source manifests hold for the file is copied, not only the ones in its file data
+                    checksums = {
+                        checksum_algorithm: self.manifests.get(source_file, checksum_algorithm)
+                        for checksum_algorithm in hashalgorithms.checksum_extensions
+                    }
+                    checksums.update(self.get_file_hashes(file_data))
+                    for checksum_algorithm, checksum in checksums.items():
+                        if checksum is None:
+                            continue
+                        self.manifests.set(destination_files[index], checksum_algorithm, checksum)
+                        durable_paths[index].append(
+                            self.manifests.get_manifest_path(os.path.dirname(destination_files[index]), checksum_algorithm)
+                        )
+                else:
+                    for checksum_algorithm in hashalgorithms.checksum_extensions:
+                        if os.path.isfile(f"{source_file}.{checksum_algorithm}"):
+                            shutil.copy2(f"{source_file}.{checksum_algorithm}", os.path.dirname(destination_files[index]))
+                            durable_paths[index].append(f"{destination_files[index]}.{checksum_algorithm}")
+                if os.path.isfile(blockhashes.get_block_hashes_path(source_file)):
+                    shutil.copy2(blockhashes.get_block_hashes_path(source_file), os.path.dirname(destination_files[index]))
+                    durable_paths[index].append(blockhashes.get_block_hashes_path(destination_files[index]))
+            except OSError as e:
+                write_errors[index] = e
+        timer.add("checksum_file", checksum_file_start)
+
+        # a copy is recorded in the job once it and its checksum files are durable, a copy that can't be synced fails
+        if file_hash is not None and copied_indexes:
+            try:
+                self.make_durable(self.get_checksum_paths(source_file, file_data), 0, timer)
+            except OSError:
+                pass  # the source checksum files are rewritten by the next generate, the copies don't depend on them
+        for index in copied_indexes:
+            if index in write_errors:
+                continue
+            try:
+                self.make_durable(durable_paths[index], bytes_copied, timer)
+            except OSError as e:
+                write_errors[index] = e
+                continue
+            self.set_job_copied(file_data["filename"], destination_locations[index])
+
+        # the phase times of the shared read are given to the first destination's result so timing summaries count them once
+        results = []
+        for index, location in enumerate(destination_locations):
+            if index in write_errors:
+                results.append(
+                    FileResult(
+                        file_data["filename"],
+                        "copy",
+                        FAIL,
+                        elapsed=time.perf_counter() - start_time,
+                        message=f"copy to {location} failed, {write_errors[index]}",
+                        location=location,
+                        error=write_errors[index],
+                    )
+                )
+                continue
+            result = self.file_result(file_data, "copy", start_time, timer, bytes_copied, location=location)
+            if any(previous_result.passed for previous_result in results):
+                result.phase_times = {}
+            results.append(result)
+        return results
+
+    # find the offset an interrupted copy of a file to the destinations can continue from, every destination's partial copy must have been
+    # checkpointed at the same offset by the job and its bytes up to the offset must still match the checkpoint digest
+    # returns the offset and the prefix hash of the bytes before it, or 0 and None to copy the file from the start
+    def get_resume_offset(self, filename, destination_locations, partial_files, source_stat, timer):
+        if self.job is None:
+            return 0, None
+        checkpoints = {self.job.get_checkpoint(filename, location, source_stat) for location in destination_locations}
+        if len(checkpoints) != 1 or None in checkpoints:
+            return 0, None
+        offset, digest = checkpoints.pop()
+
+        prefix_hash = None
+        for partial_file in partial_files:
+            partial_hash = new_prefix_hash()
+            try:
+                if self.hash_partial_copy(partial_file, offset, [partial_hash], timer) != offset:
+                    return 0, None
+            except OSError:
+                return 0, None
+            if partial_hash.hexdigest() != digest:
+                return 0, None
+            prefix_hash = prefix_hash or partial_hash
+        return offset, prefix_hash
+
+    # hash the first length bytes of a partial copy with each of the hash objects, returns the number of bytes hashed
+    def hash_partial_copy(self, partial_file, length, hash_objects, timer):
+        bytes_hashed = 0
+        with open(partial_file, "rb") as f:
+            while bytes_hashed < length:
+                read_start = time.perf_counter()
+                chunk = f.read(min(self.chunk_size, length - bytes_hashed))
+                hash_start = timer.add("read", read_start)
+                if not chunk:
+                    break
+                for hash_object in hash_objects:
+                    hash_object.update(chunk)
+                timer.add("hash", hash_start)
+                bytes_hashed += len(chunk)
+                self.throttle(len(chunk), timer)
+        return bytes_hashed
+
+    # copy file data in the kernel without passing it through python, trying a reflink clone then copy_file_range then sendfile
+    # returns the number of bytes copied, anything less than the file size is finished by the buffered copy
+    # each call is timed as the kernel_copy phase and counted by the rate limiter as a read and a write, a clone doesn't move any data
+    def kernel_copy(self, source_file, dstf, file_size, progress, timer):
+        if not sys.platform.startswith("linux") or file_size == 0:
+            return 0
+
         bytes_copied = 0
         with open(source_file, "rb") as srcf:
-            with open(destination_file, "wb") as dstf:
-                while True:
-                    buffer = srcf.read(chunk_size)
-                    if not buffer:
+            src_fd = srcf.fileno()
+            dst_fd = dstf.fileno()
+
+            try:
+                with timer.time("kernel_copy"):
+                    fcntl.ioctl(dst_fd, FICLONE, src_fd)  # the destination shares the source blocks until either is changed
+                progress.update(file_size)
+                return file_size
+            except OSError:
+                pass  # filesystem can't clone or the files are on different filesystems
+
+            try:
+                while bytes_copied < file_size:
+                    with timer.time("kernel_copy"):
+                        copied = os.copy_file_range(
+                            src_fd, dst_fd, self.chunk_size, bytes_copied, bytes_copied
+                        )
+                    if copied == 0:
                         break
-                    dstf.write(buffer)
-                    bytes_copied += len(buffer)
-                    progress_bar_refactor = 33.3
-                    wx.CallAfter(
-                        pub.sendMessage,
-                        "progress_update",
-                        file_data=file_data,
-                        file_size=total_size,
-                        byte_section=bytes_copied,
-                        progress_bar_refactor=progress_bar_refactor,
-                    )
+                    self.drop_cached(src_fd, bytes_copied, copied)
+                    self.drop_cached(dst_fd, bytes_copied, copied)
+                    bytes_copied += copied
+                    self.throttle(copied * 2, timer)
+                    progress.update(bytes_copied)
+                return bytes_copied
+            except (OSError, AttributeError):
+                pass  # copy_file_range isn't available for these filesystems, sendfile continues from bytes_copied
+
+            try:
+                os.lseek(dst_fd, bytes_copied, os.SEEK_SET)
+                while bytes_copied < file_size:
+                    with timer.time("kernel_copy"):
+                        copied = os.sendfile(dst_fd, src_fd, bytes_copied, self.chunk_size)
+                    if copied == 0:
+                        break
+                    self.drop_cached(src_fd, bytes_copied, copied)
+                    self.drop_cached(dst_fd, bytes_copied, copied)
+                    bytes_copied += copied
+                    self.throttle(copied * 2, timer)
+                    progress.update(bytes_copied)
+            except OSError:
+                pass
+
+        return bytes_copied
+
+    # copy a file from the offset through a pipeline of reader, hasher and writer stages, each working on a different buffer at the same time
+    # the reader and hasher run on their own threads and the writer of the first destination on the calling thread, every other destination
+    # has a writer thread of its own, buffers go round the stages and back to the reader once every writer is done with them so memory use is
+    # fixed at pipeline_depth chunks, phase times overlap so they add up to more than the elapsed time
+    # dstfs is an index: open file dict of the destinations, returns the offset of the end of the copy and an index: OSError dict of the
+    # destinations that couldn't be written, the copy stops early if none can
+    # with CopyCheckpoints each writer saves a checkpoint of its destination when it reaches a checkpoint marker in its queue
+    def pipelined_copy(self, source_file, dstfs, offset, file_hash, progress, timer, checkpoints=None):
+        free_buffers = queue.Queue()
+        for buffer in self.get_pipeline_buffers():
+            free_buffers.put(buffer)
+        read_queue = queue.Queue()  # (buffer, length) read from the source, None at the end or the exception that stopped the read
+        write_queue = queue.Queue() if file_hash is not None else read_queue
+        stop = threading.Event()  # set by the writer if it fails so the other stages don't wait for buffers that won't come back
+        write_errors = {}
+        pending_writes = {}  # id of a buffer: writers still to write it
+        pending_lock = threading.Lock()
+
+        def read_stage():
+            read_offset = offset
+            try:
+                srcf, direct = self.open_source(source_file, offset)
+                with srcf:
+                    while True:
+                        try:
+                            buffer = free_buffers.get(timeout=0.1)
+                        except queue.Empty:
+                            if stop.is_set():
+                                break
+                            continue
+                        if stop.is_set():
+                            break
+                        read_start = time.perf_counter()
+                        if direct:
+                            length = srcf.readinto(buffer)
+                        else:
+                            with memoryview(buffer)[: self.chunk_size] as read_view:
+                                length = srcf.readinto(read_view)
+                        timer.add("read", read_start)
+                        if not length:
+                            break
+                        read_queue.put((buffer, length))
+                        self.drop_cached(srcf.fileno(), read_offset, length)
+                        read_offset += length
+                        self.throttle(length, timer)
+            except Exception as e:
+                read_queue.put(e)
+            else:
+                read_queue.put(None)
+
+        def hash_stage():
+            while True:
+                item = read_queue.get()
+                if isinstance(item, tuple) and not stop.is_set():
+                    hash_start = time.perf_counter()
+                    with memoryview(item[0])[: item[1]] as chunk:
+                        file_hash.update(chunk)
+                    timer.add("hash", hash_start)
+                write_queue.put(item)
+                if not isinstance(item, tuple):
+                    return
+
+        # write a chunk to a destination, a destination that fails is left out of the rest of the copy
+        def write_chunk(index, dstf, buffer, length):
+            if index in write_errors:
+                return
+            write_start = time.perf_counter()
+            try:
+                with memoryview(buffer)[:length] as chunk:
+                    dstf.write(chunk)
+                if self.cache_mode != "normal":
+                    self.drop_cached(dstf.fileno(), dstf.tell() - length, length)
+            except OSError as e:
+                write_errors[index] = e
+            timer.add("write", write_start)
+            if index not in write_errors:
+                self.throttle(length, timer)  # each destination's writer waits for its own share of the rate
+
+        # flush a destination to its disk and record the checkpoint, a destination that fails is left out of the rest of the copy
+        def save_checkpoint(index, dstf, checkpoint_offset, digest):
+            if index in write_errors:
+                return
+            try:
+                checkpoints.save(index, dstf, checkpoint_offset, digest)
+            except OSError as e:
+                write_errors[index] = e
+
+        # return a buffer to the reader once the last writer has written it
+        def release_buffer(buffer):
+            with pending_lock:
+                pending_writes[id(buffer)] -= 1
+                if pending_writes[id(buffer)]:
+                    return
+                del pending_writes[id(buffer)]
+            free_buffers.put(buffer)
+
+        def write_stage(index, dstf, chunk_queue):
+            while True:
+                item = chunk_queue.get()
+                if item is None:
+                    return
+                if item[0] is None:  # (None, offset, digest) checkpoint marker
+                    save_checkpoint(index, dstf, *item[1:])
+                    continue
+                write_chunk(index, dstf, *item)
+                release_buffer(item[0])
+
+        stages = [threading.Thread(target=read_stage, daemon=True)]
+        if file_hash is not None:
+            stages.append(threading.Thread(target=hash_stage, daemon=True))
+        (first_index, first_dstf), *other_dstfs = dstfs.items()
+        writers = []
+        for index, dstf in other_dstfs:
+            chunk_queue = queue.Queue()
+            writers.append((threading.Thread(target=write_stage, args=(index, dstf, chunk_queue), daemon=True), chunk_queue))
+        for stage in stages + [writer for writer, chunk_queue in writers]:
+            stage.start()
 
-        shutil.copy2(
-            f"{source_file}.{self.checksum_algorithm}", get_destination_location
-        )  # copy .md5 to destination once file copy complete
+        bytes_copied = offset
+        try:
+            while len(write_errors) < len(dstfs):
+                item = write_queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                buffer, length = item
+                with pending_lock:
+                    pending_writes[id(buffer)] = len(dstfs)
+                for writer, chunk_queue in writers:
+                    chunk_queue.put(item)
+                digest = None
+                if checkpoints is not None:
+                    with memoryview(buffer)[:length] as chunk:
+                        digest = checkpoints.update(chunk, bytes_copied + length)
+                write_chunk(first_index, first_dstf, buffer, length)
+                release_buffer(buffer)
+                bytes_copied += length
+                if digest is not None:
+                    for writer, chunk_queue in writers:
+                        chunk_queue.put((None, bytes_copied, digest))
+                    save_checkpoint(first_index, first_dstf, bytes_copied, digest)
+                progress.update(bytes_copied)
+        finally:
+            stop.set()
+            for writer, chunk_queue in writers:
+                chunk_queue.put(None)
+                writer.join()
+            for stage in stages:
+                stage.join()
 
-    # verify existing checksums
+        return bytes_copied, write_errors
+
+    # verify existing checksums, the algorithm is detected from the checksum file found alongside the file
+    # in block hashes mode a file with a block file of its checksum is verified block by block, the failed result has the corrupt ranges
+    # in sample mode only a random sample of the blocks of an unchanged file is read, a file whose sample fails is verified in full
+    # returns a FileResult, files without a checksum in the location are skipped
     def verify_files(self, file_data, location):
+        start_time = time.perf_counter()
+        timer = PhaseTimer()
         file_path = os.path.join(location, file_data["filename"])
+
+        with timer.time("checksum_file"):
+            checksum_algorithm = self.find_checksum_file(file_path)
+            if checksum_algorithm is None:
+                return FileResult(
+                    file_data["filename"], "verify", SKIP, message=f"has no checksum in {location}", location=location
+                )
+            checksum = self.read_checksum_file(file_path, checksum_algorithm)
+
         file_size = os.path.getsize(file_path)
+        file_hash = hashalgorithms.new_hash(checksum_algorithm)
 
-        if os.path.exists(f"{file_path}.md5"):
-            with open(f"{file_path}.md5", "r") as hash_file:
-                checksum = hash_file.read(32)
-            file_hash = hashlib.md5()
-        else:
-            pass
-
-        with open(file_path, "rb") as f:
-            while chunk := f.read(8192):
-                byte_section = (
-                    f.tell()
-                )  # returns the current position of the file read pointer - can be used to update progress bar
-
-                progress_bar_refactor = 66.6
-                wx.CallAfter(
-                    pub.sendMessage,
-                    "progress_update",
-                    file_data=file_data,
-                    file_size=file_size,
-                    byte_section=byte_section,
-                    progress_bar_refactor=progress_bar_refactor,
+        progress = self.progress_reporter(file_data, file_size, "verify")
+
+        # in quick mode an unchanged file is checked against its cached checksum without reading it
+        hash_string = self.get_cached_hash(file_path, checksum_algorithm)
+        from_cache = hash_string is not None
+        byte_section = 0
+        block_hashes = self.get_block_hashes(file_path, file_size, checksum_algorithm, checksum) if not from_cache else None
+        if block_hashes is not None and self.is_sample_verify(file_path, file_size, checksum_algorithm, checksum):
+            block_count = len(block_hashes.block_checksums)
+            sample_indexes = sorted(random.sample(range(block_count), min(self.sample_blocks, block_count)))
+            if not self.verify_blocks(file_path, file_size, block_hashes, progress, timer, sample_indexes):
+                progress.update(file_size)
+                return FileResult(
+                    file_data["filename"],
+                    "verify",
+                    PASS,
+                    checksum,
+                    checksum_algorithm,
+                    sum(block_hashes.get_block_range(block_index, file_size)[1] for block_index in sample_indexes),
+                    time.perf_counter() - start_time,
+                    message=f"sampled {len(sample_indexes)} of {block_count} blocks",
+                    phase_times=timer.phase_times,
+                    location=location,
                 )
+            # the failed sample is followed by a verify of every block to find all of the corrupt ranges
+        elif not self.block_hashes:
+            block_hashes = None  # blocks are only verified in block hashes mode, or to find the corrupt blocks of a failed sample
+
+        if block_hashes is not None:
+            corrupt_ranges = self.verify_blocks(file_path, file_size, block_hashes, progress, timer)
+            byte_section = file_size
+            if corrupt_ranges:
+                return FileResult(
+                    file_data["filename"],
+                    "verify",
+                    FAIL,
+                    algorithm=checksum_algorithm,
+                    bytes_processed=byte_section,
+                    elapsed=time.perf_counter() - start_time,
+                    message=f"checksum mismatch in {location}, corrupt bytes {blockhashes.format_ranges(corrupt_ranges)}",
+                    phase_times=timer.phase_times,
+                    location=location,
+                    corrupt_ranges=corrupt_ranges,
+                )
+            hash_string = checksum  # every block matches the blocks the checksum was generated with
+            self.cache_hash(file_path, hash_string, checksum_algorithm)
+            self.record_full_verify(file_path, checksum_algorithm)
+        elif not from_cache:
+            for chunk in self.timed_read_chunks(file_path, timer):
+                byte_section += len(chunk)
+                hash_start = time.perf_counter()
                 file_hash.update(chunk)
+                timer.add("hash", hash_start)
+
+                progress.update(byte_section)
 
-        hash_string = file_hash.hexdigest()
+            hash_string = file_hash.hexdigest()
+            self.cache_hash(file_path, hash_string, checksum_algorithm)
+            if hash_string == checksum:
+                self.record_full_verify(file_path, checksum_algorithm)
+        else:
+            progress.update(file_size)
 
-        if hash_string == checksum:
-            self.hash_verified = True
+        return FileResult(
+            file_data["filename"],
+            "verify",
+            PASS if hash_string == checksum else FAIL,
+            hash_string,
+            checksum_algorithm,
+            byte_section,
+            time.perf_counter() - start_time,
+            from_cache,
+            message="" if hash_string == checksum else f"checksum mismatch in {location}",
+            phase_times=timer.phase_times,
+            location=location,
+        )
 
-        elif file_hash != checksum:
-            self.hash_verified = False
+    # get the block checksums to verify a file with, None unless the file has a block file generated with its checksum
+    # that covers the file in more than one block
+    def get_block_hashes(self, file_path, file_size, checksum_algorithm, checksum):
+        block_hashes = blockhashes.read_block_hashes(file_path)
+        if (
+            block_hashes is None
+            or block_hashes.checksum_algorithm != checksum_algorithm
+            or block_hashes.checksum != checksum
+            or not block_hashes.matches_size(file_size)
+            or len(block_hashes.block_checksums) < 2
+        ):
+            return None
+        return block_hashes
 
-        else:
-            pass
+    # check whether a file is verified from a sample of its blocks, sample mode must be on and the file's size, modified time and inode
+    # must match the hash cache entry of its checksum, files due a periodic full verify are read in full while the run's budget allows
+    def is_sample_verify(self, file_path, file_size, checksum_algorithm, checksum):
+        if not self.sample_blocks or self.hash_cache is None:
+            return False
+        if self.hash_cache.get(file_path, checksum_algorithm) != checksum:
+            return False  # changed or never verified
+        last_full_verify = self.hash_cache.get_full_verify_time(file_path, checksum_algorithm)
+        if last_full_verify is not None and time.time() - last_full_verify < self.full_verify_interval:
+            return True
+        with self.full_verify_lock:
+            if self.full_verify_budget is not None and self.full_verify_bytes + file_size > self.full_verify_budget:
+                return True  # the full verify is left for a later run
+            self.full_verify_bytes += file_size
+        return False
+
+    # record a file read in full by a passed verify, so sample mode knows when it's next due a full verify
+    def record_full_verify(self, file_path, checksum_algorithm):
+        if self.sample_blocks and self.hash_cache is not None:
+            self.hash_cache.set_full_verify_time(file_path, checksum_algorithm)
+
+    # hash the blocks of a file and check them against the block checksums, every block or just block_indexes if given
+    # block_verify_threads blocks are read at the same time, returns the (offset, length) of the blocks that don't match in file order
+    def verify_blocks(self, file_path, file_size, block_hashes, progress, timer, block_indexes=None):
+        progress_lock = threading.Lock()
+        bytes_verified = 0
+
+        def verify_block(block_index):
+            nonlocal bytes_verified
+            offset, length = block_hashes.get_block_range(block_index, file_size)
+            block_hash = hashalgorithms.new_hash(block_hashes.checksum_algorithm)
+            for chunk in self.timed_read_chunks(file_path, timer, offset, length):
+                hash_start = time.perf_counter()
+                block_hash.update(chunk)
+                timer.add("hash", hash_start)
+                with progress_lock:
+                    bytes_verified += len(chunk)
+                    progress.update(bytes_verified)
+            return block_hash.hexdigest() == block_hashes.block_checksums[block_index]
+
+        if block_indexes is None:
+            block_indexes = range(len(block_hashes.block_checksums))
+        with futures.ThreadPoolExecutor(max_workers=max(1, min(self.block_verify_threads, len(block_indexes)))) as block_executor:
+            matches = list(block_executor.map(verify_block, block_indexes))
+        return [
+            block_hashes.get_block_range(block_index, file_size)
+            for block_index, block_matches in zip(block_indexes, matches)
+            if not block_matches
+        ]
+
+    # copy the corrupt ranges of a file found by a block verify in a location again from the source, returns a FileResult
+    # each source block is checked against the location's block checksums before it's written, so a source that changed since the copy
+    # is never written into it
+    def repair_blocks(self, file_data, location, corrupt_ranges):
+        start_time = time.perf_counter()
+        timer = PhaseTimer()
+        source_file = os.path.join(self.get_source_location, file_data["filename"])
+        destination_file = os.path.join(location, file_data["filename"])
+        block_hashes = blockhashes.read_block_hashes(destination_file)
+        progress = self.progress_reporter(file_data, sum(length for offset, length in corrupt_ranges), "copy")
+
+        def repair_failed(message):
+            return FileResult(
+                file_data["filename"],
+                "repair",
+                FAIL,
+                elapsed=time.perf_counter() - start_time,
+                message=message,
+                phase_times=timer.phase_times,
+                location=location,
+            )
+
+        if block_hashes is None:
+            return repair_failed(f"has no block checksums in {location}")
+
+        bytes_repaired = 0
+        try:
+            with open(source_file, "rb") as srcf, open(destination_file, "r+b") as dstf:
+                for offset, length in corrupt_ranges:
+                    block = bytearray(length)
+                    read_start = time.perf_counter()
+                    srcf.seek(offset)
+                    bytes_read = srcf.readinto(block)
+                    timer.add("read", read_start)
+                    self.throttle(bytes_read, timer)
+                    hash_start = time.perf_counter()
+                    block_hash = hashalgorithms.new_hash(block_hashes.checksum_algorithm)
+                    block_hash.update(block)
+                    write_start = timer.add("hash", hash_start)
+                    if bytes_read != length or block_hash.hexdigest() != block_hashes.block_checksums[offset // block_hashes.block_size]:
+                        return repair_failed(f"source bytes {blockhashes.format_ranges([(offset, length)])} don't match the block checksums")
+                    dstf.seek(offset)
+                    dstf.write(block)
+                    timer.add("write", write_start)
+                    self.throttle(length, timer)
+                    bytes_repaired += length
+                    progress.update(bytes_repaired)
+                with timer.time("fsync"):
+                    dstf.flush()
+                    os.fsync(dstf.fileno())
+        except OSError as e:
+            return repair_failed(f"repair in {location} failed, {e}")
+
+        return FileResult(
+            file_data["filename"],
+            "repair",
+            PASS,
+            algorithm=block_hashes.checksum_algorithm,
+            bytes_processed=bytes_repaired,
+            elapsed=time.perf_counter() - start_time,
+            message=f"recopied bytes {blockhashes.format_ranges(corrupt_ranges)} in {location}",
+            phase_times=timer.phase_times,
+            location=location,
+        )
+
+
+# summarise the results of a run, returns the total bytes and seconds of file operations, the seconds spent in each phase
+# and the slowest files as (elapsed, process, filename, bytes per second)
+def summarise_timings(results, slowest_count=10):
+    phase_times = dict.fromkeys(timing_phases, 0.0)
+    total_bytes = 0
+    total_seconds = 0.0
+    for result in results:
+        total_bytes += result.bytes_processed
+        total_seconds += result.elapsed
+        for phase, seconds in result.phase_times.items():
+            phase_times[phase] += seconds
+
+    slowest_files = sorted(
+        ((result.elapsed, result.process, result.filename, result.bytes_per_second) for result in results),
+        reverse=True,
+    )[:slowest_count]
+    return {
+        "bytes": total_bytes,
+        "seconds": total_seconds,
+        "phase_times": phase_times,
+        "slowest_files": slowest_files,
+    }
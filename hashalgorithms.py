@@ -0,0 +1,144 @@
+import hashlib
+import threading
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None  # BLAKE3 is only offered when the blake3 package is installed
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None  # xxHash is only offered when the xxhash package is installed
+
+
+# hash algorithm name: function returning a new hash object, every algorithm writes its checksum file with its name as the extension
+# hashlib uses OpenSSL so sha1 and sha256 use the CPU's SHA extensions where they're available
+hash_algorithms = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+}
+
+if blake3 is not None:
+    hash_algorithms["blake3"] = lambda: blake3.blake3(max_threads=blake3.blake3.AUTO)  # hashes large chunks on all CPU cores
+
+if xxhash is not None:
+    hash_algorithms["xxh3"] = xxhash.xxh3_64  # non-cryptographic, detects corruption but not tampering
+    hash_algorithms["xxh128"] = xxhash.xxh3_128
+
+# checksum file extensions of every supported algorithm, checksum files are left out of the file list even if their algorithm isn't installed
+checksum_extensions = ("md5", "sha1", "sha256", "blake2b", "blake3", "xxh3", "xxh128")
+
+
+# create a new hash object for an algorithm name
+def new_hash(checksum_algorithm):
+    if checksum_algorithm not in hash_algorithms:
+        raise ValueError(f"unsupported checksum algorithm: {checksum_algorithm}")
+    return hash_algorithms[checksum_algorithm]()
+
+
+# get the checksum string from the contents of a checksum file, in the md5sum format "checksum  *filename"
+def parse_checksum(checksum_file_text):
+    fields = checksum_file_text.split(maxsplit=1)
+    if not fields:
+        return None
+    return fields[0].lower()
+
+
+# This class is responsible for hashing a file in fixed size blocks with one algorithm, the checksum of each block is kept
+# so the blocks of a copy that don't match can be found and copied again without copying the whole file
+class BlockHash:
+    def __init__(self, checksum_algorithm, block_size):
+        self.checksum_algorithm = checksum_algorithm
+        self.block_size = block_size
+        self.block_checksums = []  # hex digests of the completed blocks
+        self.block_hash = new_hash(checksum_algorithm)
+        self.block_length = 0  # bytes hashed into the current block
+
+    def update(self, chunk):
+        with memoryview(chunk) as chunk_view:
+            chunk_offset = 0
+            while chunk_offset < len(chunk_view):
+                length = min(len(chunk_view) - chunk_offset, self.block_size - self.block_length)
+                with chunk_view[chunk_offset : chunk_offset + length] as block_part:
+                    self.block_hash.update(block_part)
+                chunk_offset += length
+                self.block_length += length
+                if self.block_length == self.block_size:
+                    self.block_checksums.append(self.block_hash.hexdigest())
+                    self.block_hash = new_hash(self.checksum_algorithm)
+                    self.block_length = 0
+
+    # hex digest of every block, the last block is shorter than block_size unless the file is a whole number of blocks
+    def hexdigests(self):
+        if self.block_length:
+            return self.block_checksums + [self.block_hash.hexdigest()]
+        return list(self.block_checksums)
+
+
+# This class is responsible for computing several checksums from one read of a file
+# each extra algorithm runs in its own thread on the same chunk while the calling thread runs the first, hashlib releases the GIL while hashing
+# so a chunk takes as long as the slowest algorithm rather than the sum of them all
+# with a block_size the blocks of the file are also hashed with the first algorithm, on a thread of their own
+class MultiHash:
+    def __init__(self, checksum_algorithms, threaded=True, block_size=None):
+        self.hashes = {checksum_algorithm: new_hash(checksum_algorithm) for checksum_algorithm in checksum_algorithms}
+        self.block_hash = BlockHash(checksum_algorithms[0], block_size) if block_size else None
+        self.chunk = None
+        self.workers = []
+        hash_objects = list(self.hashes.values())
+        if self.block_hash is not None:
+            hash_objects.append(self.block_hash)
+        self.hash_objects = hash_objects
+        if threaded and len(hash_objects) > 1:
+            self.barrier = threading.Barrier(len(hash_objects))  # the calling thread and every worker meet at the start and end of each chunk
+            for hash_object in hash_objects[1:]:
+                worker = threading.Thread(target=self.run_worker, args=(hash_object,), daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def run_worker(self, hash_object):
+        while True:
+            self.barrier.wait()
+            if self.chunk is None:
+                return
+            hash_object.update(self.chunk)
+            self.barrier.wait()
+
+    # hash a chunk with every algorithm, returns once they have all finished so the chunk's buffer can be reused
+    def update(self, chunk):
+        if not self.workers:
+            for hash_object in self.hash_objects:
+                hash_object.update(chunk)
+            return
+
+        self.chunk = chunk
+        self.barrier.wait()
+        self.hash_objects[0].update(chunk)
+        self.barrier.wait()
+        self.chunk = None
+
+    # algorithm: hex digest of every checksum
+    def hexdigests(self):
+        return {checksum_algorithm: hash_object.hexdigest() for checksum_algorithm, hash_object in self.hashes.items()}
+
+    # hex digest of every block, None without a block_size
+    def block_hexdigests(self):
+        return self.block_hash.hexdigests() if self.block_hash is not None else None
+
+    # stop the worker threads, self.chunk is None so they return at the next barrier
+    def close(self):
+        if self.workers:
+            self.chunk = None
+            self.barrier.wait()
+            for worker in self.workers:
+                worker.join()
+            self.workers = []
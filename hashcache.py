@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+# This class is responsible for storing file checksums between runs so unchanged files don't have to be read again
+# a file is unchanged if its path, size, modified time and inode all match the cached entry
+class HashCache:
+    def __init__(
+        self,
+        cache_location=os.path.expanduser("~/Documents/aca/hashcache.db"),
+        max_entries=1000000,
+    ):
+        self.max_entries = max_entries  # least recently used entries are evicted above this size
+        self.writes_since_eviction = 0
+        self.lock = threading.Lock()  # the connection is shared by the worker threads
+
+        os.makedirs(os.path.dirname(cache_location), exist_ok=True)
+        self.connection = sqlite3.connect(cache_location, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (path, algorithm)
+            )"""
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS file_hashes_last_used ON file_hashes (last_used)"
+        )
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS full_verifies (
+                path TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                verified REAL NOT NULL,
+                PRIMARY KEY (path, algorithm)
+            )"""
+        )  # time each file was last read in full by a verify, for sampled verifies
+        self.connection.commit()
+
+    # get the cached digest for a file, returns None if the file isn't cached or has changed since it was hashed
+    def get(self, file_path, algorithm, file_stat=None):
+        try:
+            file_stat = file_stat or os.stat(file_path)
+            with self.lock:
+                row = self.connection.execute(
+                    "SELECT digest, last_used FROM file_hashes WHERE path = ? AND algorithm = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                    (
+                        os.path.abspath(file_path),
+                        algorithm,
+                        file_stat.st_size,
+                        file_stat.st_mtime_ns,
+                        file_stat.st_ino,
+                    ),
+                ).fetchone()
+                if row is None:
+                    return None
+                if time.time() - row[1] > 3600:  # only record use hourly so listing a directory doesn't write every row
+                    self.connection.execute(
+                        "UPDATE file_hashes SET last_used = ? WHERE path = ? AND algorithm = ?",
+                        (time.time(), os.path.abspath(file_path), algorithm),
+                    )
+                    self.connection.commit()
+                return row[0]
+        except (OSError, sqlite3.Error):
+            return None  # a missing file or unreadable cache is treated as a cache miss
+
+    # store the digest for a file along with its current identity
+    def put(self, file_path, algorithm, digest, file_stat=None):
+        try:
+            file_stat = file_stat or os.stat(file_path)
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        os.path.abspath(file_path),
+                        algorithm,
+                        file_stat.st_size,
+                        file_stat.st_mtime_ns,
+                        file_stat.st_ino,
+                        digest,
+                        time.time(),
+                    ),
+                )
+                self.connection.commit()
+
+                self.writes_since_eviction += 1
+                if self.writes_since_eviction >= 1000:
+                    self.evict()
+        except (OSError, sqlite3.Error):
+            pass  # the cache is an optimisation, failing to store an entry doesn't affect the file operation
+
+    # get the time a file was last verified by reading it in full, None if it never has been
+    def get_full_verify_time(self, file_path, algorithm):
+        try:
+            with self.lock:
+                row = self.connection.execute(
+                    "SELECT verified FROM full_verifies WHERE path = ? AND algorithm = ?",
+                    (os.path.abspath(file_path), algorithm),
+                ).fetchone()
+            return row[0] if row is not None else None
+        except sqlite3.Error:
+            return None  # an unreadable cache is treated as a file that is due a full verify
+
+    # record that a file was verified by reading it in full
+    def set_full_verify_time(self, file_path, algorithm):
+        try:
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO full_verifies VALUES (?, ?, ?)",
+                    (os.path.abspath(file_path), algorithm, time.time()),
+                )
+                self.connection.commit()
+        except sqlite3.Error:
+            pass
+
+    # remove the least recently used entries above max_entries, called with the lock held
+    def evict(self):
+        self.writes_since_eviction = 0
+        self.connection.execute(
+            "DELETE FROM file_hashes WHERE rowid IN (SELECT rowid FROM file_hashes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.connection.execute(
+            "DELETE FROM full_verifies WHERE NOT EXISTS (SELECT 1 FROM file_hashes WHERE file_hashes.path = full_verifies.path AND file_hashes.algorithm = full_verifies.algorithm)"
+        )
+        self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
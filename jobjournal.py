@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# states of a file at a destination, in the order a copy goes through them
+PARTIAL = "partial"  # copy interrupted, the bytes up to offset are in the destination's partial copy file
+COPIED = "copied"  # copy complete, not yet verified
+VERIFIED = "verified"  # copy complete and verified, or verify skipped
+
+
+# This class is responsible for recording the progress of copy jobs so an interrupted copy can be resumed
+# each file at each destination has a state, and partial copies have the byte offset reached and a digest of the bytes up to it
+class JobJournal:
+    def __init__(self, journal_location=os.path.expanduser("~/Documents/aca/jobs.db")):
+        self.lock = threading.Lock()  # the connection is shared by the worker threads
+
+        os.makedirs(os.path.dirname(journal_location), exist_ok=True)
+        self.connection = sqlite3.connect(journal_location, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                destinations TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                created REAL NOT NULL,
+                finished REAL
+            )"""
+        )
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS job_files (
+                job_id INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                state TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                digest TEXT,
+                source_size INTEGER NOT NULL,
+                source_mtime_ns INTEGER NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (job_id, filename, destination)
+            )"""
+        )
+        self.connection.commit()
+
+    # start a new copy job, settings is a JSON serialisable dict of the options needed to resume it
+    def create_job(self, source, destinations, settings=None):
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO jobs (source, destinations, settings, created) VALUES (?, ?, ?, ?)",
+                (os.path.abspath(source), json.dumps(destinations), json.dumps(settings or {}), time.time()),
+            )
+            self.connection.commit()
+            return Job(self, cursor.lastrowid, os.path.abspath(source), destinations, settings or {})
+
+    # get a job by id, returns None if there is no such job
+    def get_job(self, job_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT job_id, source, destinations, settings FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(self, row[0], row[1], json.loads(row[2]), json.loads(row[3]))
+
+    # get the unfinished jobs, most recent first
+    def get_unfinished_jobs(self):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT job_id, source, destinations, settings FROM jobs WHERE finished IS NULL ORDER BY job_id DESC"
+            ).fetchall()
+        return [Job(self, row[0], row[1], json.loads(row[2]), json.loads(row[3])) for row in rows]
+
+    # get the most recent unfinished job copying a source to the same destinations, None if there isn't one
+    def find_unfinished_job(self, source, destinations):
+        for job in self.get_unfinished_jobs():
+            if job.source == os.path.abspath(source) and job.destinations == destinations:
+                return job
+        return None
+
+    def set_file_state(self, job_id, filename, destination, state, offset=0, digest=None, source_stat=None):
+        try:
+            self.write_file_state(job_id, filename, destination, state, offset, digest, source_stat)
+        except sqlite3.Error:
+            pass  # the journal only makes copies resumable, failing to record a state doesn't affect the copy
+
+    def write_file_state(self, job_id, filename, destination, state, offset, digest, source_stat):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO job_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    filename,
+                    destination,
+                    state,
+                    offset,
+                    digest,
+                    source_stat.st_size if source_stat is not None else 0,
+                    source_stat.st_mtime_ns if source_stat is not None else 0,
+                    time.time(),
+                ),
+            )
+            self.connection.commit()
+
+    # get the (state, offset, digest, source size, source mtime_ns) of a file at a destination, None if the job hasn't reached it
+    def get_file_state(self, job_id, filename, destination):
+        try:
+            with self.lock:
+                return self.connection.execute(
+                    "SELECT state, offset, digest, source_size, source_mtime_ns FROM job_files WHERE job_id = ? AND filename = ? AND destination = ?",
+                    (job_id, filename, destination),
+                ).fetchone()
+        except sqlite3.Error:
+            return None  # an unreadable journal is treated as a file the job hasn't reached
+
+    def finish_job(self, job_id):
+        with self.lock:
+            self.connection.execute("UPDATE jobs SET finished = ? WHERE job_id = ?", (time.time(), job_id))
+            self.connection.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))  # finished jobs don't need their file states
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# This class is responsible for one copy job in the journal, it is given to the filehashingservice to record the progress of each copy
+class Job:
+    def __init__(self, journal, job_id, source, destinations, settings):
+        self.journal = journal
+        self.job_id = job_id
+        self.source = source
+        self.destinations = destinations
+        self.settings = settings
+
+    # record the bytes of a copy that are on the destination disk and the digest of them
+    def checkpoint(self, filename, destination, offset, digest, source_stat):
+        self.journal.set_file_state(self.job_id, filename, destination, PARTIAL, offset, digest, source_stat)
+
+    def set_copied(self, filename, destination):
+        self.journal.set_file_state(self.job_id, filename, destination, COPIED)
+
+    def set_verified(self, filename, destination):
+        self.journal.set_file_state(self.job_id, filename, destination, VERIFIED)
+
+    # get the state of a file at a destination, None if this job hasn't copied it
+    def get_state(self, filename, destination):
+        file_state = self.journal.get_file_state(self.job_id, filename, destination)
+        return file_state[0] if file_state is not None else None
+
+    # get the (offset, digest) of a partial copy, None if there isn't one or the source has changed since it was checkpointed
+    def get_checkpoint(self, filename, destination, source_stat):
+        file_state = self.journal.get_file_state(self.job_id, filename, destination)
+        if file_state is None or file_state[0] != PARTIAL:
+            return None
+        state, offset, digest, source_size, source_mtime_ns = file_state
+        if (source_size, source_mtime_ns) != (source_stat.st_size, source_stat.st_mtime_ns):
+            return None
+        return offset, digest
+
+    def finish(self):
+        self.journal.finish_job(self.job_id)
@@ -0,0 +1,179 @@
+import os
+import subprocess
+import sys
+import threading
+from concurrent import futures
+
+# ionice arguments for the io priorities of worker threads, normal leaves the priority unchanged
+io_priorities = {
+    "normal": None,
+    "low": ["-c", "2", "-n", "7"],  # lowest best effort priority
+    "idle": ["-c", "3"],  # only reads and writes when no other process is using the disk
+}
+
+
+# This class is responsible for running file jobs in parallel, limiting the number of concurrent streams on each storage device
+# submitted jobs wait in a queue until every device they use has a free stream and a worker is free, only then are they given to the
+# worker pool, so a job waiting for a busy device never holds a worker that jobs for other devices could use
+class DeviceScheduler:
+    def __init__(self, max_workers=4, rotational_streams=1, solid_state_streams=4, unknown_streams=2):
+        self.max_workers = None
+        self.thread_pool_executor = None
+        self.device_types = {}  # device id: True for a spinning disk, False for a solid state drive, None if unknown
+        self.device_streams = {}  # device id: streams running on that device
+        self.queued_jobs = []  # (future, devices, fn, args) of jobs waiting for their devices, in the order they were submitted
+        self.running_jobs = 0
+        self.is_shutdown = False
+        self.device_lock = threading.Condition()  # guards the queue and stream counts, notified when a job finishes
+        self.nice = 0  # niceness of the worker threads, 0 leaves it unchanged
+        self.io_priority = "normal"  # io_priorities key of the worker threads
+        self.thread_priorities = threading.local()  # (nice, io_priority) already set on each worker thread
+        self.configure(max_workers, rotational_streams, solid_state_streams, unknown_streams)
+
+    # set the worker and per device stream limits, the worker pool is only rebuilt if the number of workers changes
+    # streams already running keep counting against the new limits, so lowering a limit only starts new jobs once the device is below it
+    def configure(self, max_workers, rotational_streams=1, solid_state_streams=4, unknown_streams=2):
+        with self.device_lock:
+            self.rotational_streams = max(1, rotational_streams)
+            self.solid_state_streams = max(1, solid_state_streams)
+            self.unknown_streams = max(1, unknown_streams)
+
+            if max_workers != self.max_workers:
+                if self.thread_pool_executor is not None:
+                    self.thread_pool_executor.shutdown(wait=False)  # jobs already given to the old pool still run to completion
+                self.max_workers = max(1, max_workers)
+                self.thread_pool_executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+            self.dispatch_jobs()
+
+    # get the id of the device a file or directory is stored on
+    def get_device(self, path):
+        while path and not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent  # files not yet copied use the device of their destination directory
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return None
+
+    # check if a device is a spinning disk, returns None if it can't be determined (network shares, non Linux systems)
+    def is_rotational(self, device):
+        if os.name != "posix":
+            return None
+
+        block_device = f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+        if not os.path.exists(block_device):
+            return None
+
+        # partitions don't have a queue directory, their parent block device does
+        block_device = os.path.realpath(block_device)
+        for queue_path in (block_device, os.path.dirname(block_device)):
+            rotational_file = os.path.join(queue_path, "queue", "rotational")
+            if os.path.exists(rotational_file):
+                with open(rotational_file, "r") as f:
+                    return f.read().strip() == "1"
+        return None
+
+    # get the number of concurrent streams allowed on a device, its type is checked on first use
+    def get_device_limit(self, device):
+        if device not in self.device_types:
+            self.device_types[device] = self.is_rotational(device) if device is not None else None
+        rotational = self.device_types[device]
+        if rotational is None:
+            return self.unknown_streams
+        return self.rotational_streams if rotational else self.solid_state_streams
+
+    # submit a job for the devices of the files it reads or writes, returns a Future of its result
+    # the job is queued until every one of its devices has a free stream
+    def submit(self, fn, *args, paths=()):
+        devices = {self.get_device(path) for path in paths}
+        future = futures.Future()
+        with self.device_lock:
+            if self.is_shutdown:
+                raise RuntimeError("cannot schedule new jobs after shutdown")
+            self.queued_jobs.append((future, devices, fn, args))
+            self.dispatch_jobs()
+        return future
+
+    # give the worker pool every queued job whose devices all have a free stream, oldest first, while a worker is free
+    # a job for a busy device doesn't hold up the jobs behind it for other devices, called with the device_lock held
+    def dispatch_jobs(self):
+        remaining_jobs = []
+        for job in self.queued_jobs:
+            future, devices, fn, args = job
+            if future.cancelled():
+                continue
+            if self.running_jobs >= self.max_workers or any(
+                self.device_streams.get(device, 0) >= self.get_device_limit(device) for device in devices
+            ):
+                remaining_jobs.append(job)
+                continue
+            self.running_jobs += 1
+            for device in devices:
+                self.device_streams[device] = self.device_streams.get(device, 0) + 1
+            self.thread_pool_executor.submit(self.run_job, future, devices, fn, args)
+        self.queued_jobs = remaining_jobs
+
+    # stop accepting jobs, with cancel_futures the queued jobs are cancelled, otherwise they still run
+    # with wait the call returns once every job has finished
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self.device_lock:
+            self.is_shutdown = True
+            if cancel_futures:
+                for future, devices, fn, args in self.queued_jobs:
+                    future.cancel()
+                self.queued_jobs = []
+            if wait:
+                while self.queued_jobs or self.running_jobs:
+                    self.device_lock.wait()
+            thread_pool_executor = self.thread_pool_executor
+        thread_pool_executor.shutdown(wait=wait)
+
+    # lower the cpu and io priority of the calling worker thread to nice and io_priority, Linux only as elsewhere they apply to the whole process
+    # threads started by the job inherit the priority, a priority can't be raised again without privileges so it's only ever lowered
+    def set_thread_priority(self):
+        priority = (self.nice, self.io_priority)
+        if not sys.platform.startswith("linux") or getattr(self.thread_priorities, "priority", None) == priority:
+            return
+        self.thread_priorities.priority = priority
+        thread_id = threading.get_native_id()
+        try:
+            if self.nice > os.getpriority(os.PRIO_PROCESS, thread_id):
+                os.setpriority(os.PRIO_PROCESS, thread_id, self.nice)
+        except OSError:
+            pass
+        if io_priorities.get(self.io_priority) is not None:
+            try:
+                subprocess.run(
+                    ["ionice", *io_priorities[self.io_priority], "-p", str(thread_id)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    check=False,
+                )
+            except OSError:
+                pass  # ionice isn't installed, the thread keeps its io priority
+
+    # run a dispatched job on a worker thread, its device streams are freed for the queued jobs before its future is completed
+    def run_job(self, future, devices, fn, args):
+        result = error = None
+        if future.set_running_or_notify_cancel():
+            try:
+                self.set_thread_priority()
+                result = fn(*args)
+            except BaseException as e:
+                error = e
+
+        with self.device_lock:
+            self.running_jobs -= 1
+            for device in devices:
+                self.device_streams[device] -= 1
+            self.dispatch_jobs()
+            self.device_lock.notify_all()
+
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
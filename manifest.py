@@ -0,0 +1,134 @@
+import os
+import shutil
+import threading
+import tempfile
+
+manifest_name = "checksums"  # manifests are named checksums.<algorithm>, e.g. checksums.md5
+
+
+# escape a filename for a checksum line the way md5sum does, names with a backslash or newline are marked with a leading backslash
+def escape_filename(filename):
+    if "\\" not in filename and "\n" not in filename:
+        return "", filename
+    return "\\", filename.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def unescape_filename(filename):
+    return filename.replace("\\\\", "\0").replace("\\n", "\n").replace("\0", "\\")
+
+
+# format a checksum line in the md5sum / sha256sum binary mode format "checksum *filename"
+def format_line(filename, checksum):
+    prefix, filename = escape_filename(filename)
+    return f"{prefix}{checksum} *{filename}\n"
+
+
+# get the (filename, checksum) from a checksum line, returns None for lines that aren't checksum lines
+# reads the binary "checksum *filename" and text "checksum  filename" formats, and the "checksum  *filename" format of aca's checksum files
+def parse_line(line):
+    line = line.rstrip("\r\n")
+    escaped = line.startswith("\\")
+    if escaped:
+        line = line[1:]
+    checksum, separator, filename = line.partition(" ")
+    if not separator or not filename or filename[0] not in " *":
+        return None
+    filename = filename[1:]
+    if line[len(checksum) : len(checksum) + 3] == "  *":
+        filename = filename[1:]
+    if escaped:
+        filename = unescape_filename(filename)
+    return filename, checksum.lower()
+
+
+# This class is responsible for one directory's checksum list for one algorithm, held in memory as a filename: checksum dict
+# new entries are appended to the file, changed entries rewrite it to a temporary file that replaces the original
+class Manifest:
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        self.entries.clear()
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8", newline="\n") as f:
+                for line in f:
+                    entry = parse_line(line)
+                    if entry is not None:
+                        self.entries[entry[0]] = entry[1]  # a later line for the same file replaces an earlier one
+        except FileNotFoundError:
+            pass
+
+    def get(self, filename):
+        return self.entries.get(filename)
+
+    def set(self, filename, checksum):
+        with self.lock:
+            previous_checksum = self.entries.get(filename)
+            if previous_checksum == checksum:
+                return
+            self.entries[filename] = checksum
+            if previous_checksum is None:
+                self.append(filename, checksum)
+            else:
+                self.rewrite()
+
+    # add a line with a single write to a file opened for appending, so the line is never left half written between other writers' lines
+    def append(self, filename, checksum):
+        fd = os.open(self.manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            os.write(fd, format_line(filename, checksum).encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    # write every entry to a temporary file in the same directory and replace the manifest with it, readers see either the old or new list
+    def rewrite(self):
+        directory = os.path.dirname(self.manifest_path)
+        fd, temporary_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.manifest_path)}.", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                for filename, checksum in self.entries.items():
+                    f.write(format_line(filename, checksum))
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.manifest_path):
+                shutil.copymode(self.manifest_path, temporary_path)  # mkstemp files are only readable by their owner
+            os.replace(temporary_path, self.manifest_path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+
+# This class is responsible for the manifests of every directory that has been read or written, loaded on first use
+class ManifestStore:
+    def __init__(self):
+        self.manifests = {}  # (directory, algorithm): Manifest
+        self.lock = threading.Lock()
+
+    # get the manifest path for a directory and algorithm
+    def get_manifest_path(self, directory, checksum_algorithm):
+        return os.path.join(directory, f"{manifest_name}.{checksum_algorithm}")
+
+    def get_manifest(self, directory, checksum_algorithm):
+        key = (os.path.abspath(directory), checksum_algorithm)
+        with self.lock:
+            if key not in self.manifests:
+                self.manifests[key] = Manifest(self.get_manifest_path(*key))
+            return self.manifests[key]
+
+    # get the checksum of a file from its directory's manifest, None if it isn't listed
+    def get(self, file_path, checksum_algorithm):
+        directory, filename = os.path.split(file_path)
+        return self.get_manifest(directory, checksum_algorithm).get(filename)
+
+    # add or update the checksum of a file in its directory's manifest
+    def set(self, file_path, checksum_algorithm, checksum):
+        directory, filename = os.path.split(file_path)
+        self.get_manifest(directory, checksum_algorithm).set(filename, checksum)
+
+    # forget the loaded manifests so they are read again, called before a directory scan to pick up changes made outside aca
+    def clear(self):
+        with self.lock:
+            self.manifests.clear()
@@ -0,0 +1,64 @@
+import collections
+import threading
+import time
+
+
+# This class is responsible for limiting the rate files are read and written to a number of bytes per second, shared by every worker thread
+# a token bucket that refills at the rate and holds up to burst_seconds of tokens, a read larger than the bucket is allowed once the bucket
+# is full and leaves it in debt so the average rate still holds, the rate can be changed while files are being read
+# the bytes read and written are also counted so the throughput of every worker together can be shown
+class RateLimiter:
+    def __init__(self, bytes_per_second=None, burst_seconds=0.5, throughput_window=2.0):
+        self.condition = threading.Condition()
+        self.bytes_per_second = bytes_per_second  # None or 0 for no limit
+        self.burst_seconds = burst_seconds
+        self.throughput_window = throughput_window  # seconds of reads the throughput is measured over
+        self.tokens = 0.0
+        self.last_refill_time = time.monotonic()
+        self.recent_reads = collections.deque()  # (time, bytes) of the reads in the throughput window
+
+    # change the rate, threads waiting for tokens carry on at the new rate straight away
+    def set_rate(self, bytes_per_second):
+        with self.condition:
+            self.refill()
+            self.bytes_per_second = bytes_per_second
+            self.condition.notify_all()
+
+    # add the tokens earned since the last refill, called with the condition held
+    def refill(self):
+        current_time = time.monotonic()
+        if self.bytes_per_second:
+            self.tokens = min(
+                self.tokens + (current_time - self.last_refill_time) * self.bytes_per_second,
+                self.bytes_per_second * self.burst_seconds,
+            )
+        self.last_refill_time = current_time
+
+    # wait until byte_count bytes can be read or written at the rate, returns True if it had to wait
+    def acquire(self, byte_count):
+        waited = False
+        with self.condition:
+            while self.bytes_per_second:
+                self.refill()
+                if self.tokens >= 0:
+                    self.tokens -= byte_count
+                    break
+                waited = True
+                self.condition.wait(-self.tokens / self.bytes_per_second)
+            current_time = time.monotonic()
+            self.recent_reads.append((current_time, byte_count))
+            self.prune_reads(current_time)
+        return waited
+
+    # drop the reads older than the throughput window, so the reads kept stay bounded whether or not the throughput is read
+    # called with the condition held
+    def prune_reads(self, current_time):
+        window_start = current_time - self.throughput_window
+        while self.recent_reads and self.recent_reads[0][0] < window_start:
+            self.recent_reads.popleft()
+
+    # bytes per second read and written by every worker over the throughput window
+    def get_throughput(self):
+        with self.condition:
+            self.prune_reads(time.monotonic())
+            return sum(byte_count for read_time, byte_count in self.recent_reads) / self.throughput_window